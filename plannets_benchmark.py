@@ -0,0 +1,262 @@
+"""Headless, seeded performance scenarios for plannets_collision.
+
+Every scenario builds a Simulation from a fixed seed, steers Earth with a
+scripted input pattern and times each frame (one simulation tick plus, by
+default, a full draw through the SDL dummy drivers). Results are written
+as JSON; pass ``--baseline`` to compare against an earlier run and fail
+when a scenario's median or p99 frame time regresses past ``--threshold``.
+
+    python plannets_benchmark.py --output bench.json
+    python plannets_benchmark.py --baseline bench.json --threshold 0.15
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+
+import numpy as np
+import pygame
+
+import plannets_collision as game
+
+WARMUP_FRAMES = 30
+DEFAULT_FRAMES = 600
+DEFAULT_THRESHOLD = 0.10  # allowed slowdown before a scenario counts as regressed
+COMPARED_STATS = ("p50_ms", "p99_ms")
+# Baselines recorded under a different setup are not compared at all.
+MATCHED_ENVIRONMENT = ("rendered", "dirty_rects", "machine", "python")
+FRAME_BUDGET_MS = 1000 / game.GAME_FPS
+
+
+def scripted_inputs(frame):
+    """Sweep Earth through every direction combination, never pressing SPACE."""
+    return (frame // 37) % 16
+
+
+def level_one_baseline():
+    return game.Simulation(seed=1, level=1), None
+
+
+def level_ten_asteroid_field():
+    # Level 10 asks for 50 * 1.5 ** 9 asteroids, which MAX_ASTEROIDS caps at 1000.
+    return game.Simulation(seed=10, level=10), None
+
+
+def asteroid_crowd(count):
+    """Replace level 1's asteroid field with ``count`` asteroids in the same ring.
+
+    MAX_ASTEROIDS caps what levels spawn, so the crowd is added directly.
+    """
+    sim = game.Simulation(seed=2, level=1)
+    bodies = sim.bodies
+    bodies.active[bodies.kind == game.ASTEROID_KIND] = False
+    bodies.compact()
+    game.spawn_asteroid_field(bodies, sim.np_rng, count)
+    return sim, None
+
+
+def open_asteroid_field(count):
+    """Fill an otherwise empty screen with ``count`` asteroids.
+
+    Asteroids share one radius and equal radii never swallow, so with the
+    planets removed the whole field stays alive; only the sun's disc is
+    kept clear. Without Earth the level reads as game over, so no flares
+    spawn and the sun does not age.
+    """
+    sim = game.Simulation(seed=2, level=1)
+    bodies = sim.bodies
+    bodies.clear()
+    rng = sim.np_rng
+    margin = game.ASTEROID_RADIUS
+    x = rng.uniform(margin, game.WIDTH - margin, count)
+    y = rng.uniform(margin, game.HEIGHT - margin, count)
+    # Redraw only the asteroids that landed on the sun.
+    pending = np.arange(count)
+    while pending.size:
+        dist = np.hypot(x[pending] - game.SUN_POS[0], y[pending] - game.SUN_POS[1])
+        pending = pending[dist <= sim.sun_radius + margin + 20]
+        x[pending] = rng.uniform(margin, game.WIDTH - margin, pending.size)
+        y[pending] = rng.uniform(margin, game.HEIGHT - margin, pending.size)
+    bodies.add(
+        game.ASTEROID_KIND, x, y,
+        rng.uniform(-2, 2, count), rng.uniform(-2, 2, count),
+        game.ASTEROID_RADIUS, game.ASTEROID_COLOR,
+    )
+    return sim, None
+
+
+def collapse_wave():
+    """Collapse the sun into the 150-flare wave on the first timed frame."""
+    sim = game.Simulation(seed=3, level=3)
+    sim.sun_age_frames = game.SUN_AGE_MAX_FRAMES - 1 - WARMUP_FRAMES
+    return sim, None
+
+
+def black_hole_swarm(ghosts=300):
+    """Open the black hole stage and fill it with extra hunting ghosts."""
+    sim = game.Simulation(seed=4, level=4)
+    sim.sun_collapsed = True
+    sim.white_dwarf_age_frames = game.WHITE_DWARF_MAX_FRAMES - 1
+    sim.step(0)
+    extra = ghosts - len(sim.black_hole_ghosts)
+    angle = sim.np_rng.uniform(0, 2 * math.pi, extra)
+    distance = sim.np_rng.uniform(sim.sun_radius + 120, sim.sun_radius + 700, extra)
+    sim.black_hole_ghosts.add(
+        game.SUN_POS[0] + np.cos(angle) * distance,
+        game.SUN_POS[1] + np.sin(angle) * distance,
+        sim.np_rng.uniform(game.BLACK_HOLE_GHOST_SPEED_MIN, game.BLACK_HOLE_GHOST_SPEED_MAX, extra),
+        sim.np_rng.uniform(0, 2 * math.pi, extra),
+    )
+    return sim, None
+
+
+def particle_storm():
+    """Keep both particle pools near capacity with a sun impact every tick."""
+    sim = game.Simulation(seed=5, level=2)
+
+    def before_step(frame):
+        angle = sim.np_rng.uniform(0, 2 * math.pi)
+        normal = (math.cos(angle), math.sin(angle))
+        impact = (
+            game.SUN_POS[0] + normal[0] * sim.sun_radius,
+            game.SUN_POS[1] + normal[1] * sim.sun_radius,
+        )
+        for _ in range(4):
+            game.spawn_sun_impact_splash(sim.np_rng, sim.sun_impact_splashes, impact, normal)
+            game.spawn_moon_debris(sim.np_rng, sim.planet_debris_particles, impact)
+
+    return sim, before_step
+
+
+SCENARIOS = {
+    "level1_baseline": level_one_baseline,
+    "level10_1000_asteroids": level_ten_asteroid_field,
+    "crowd_10000_asteroids": lambda: asteroid_crowd(10_000),
+    "field_100000_asteroids": lambda: open_asteroid_field(100_000),
+    "collapse_wave_150_flares": collapse_wave,
+    "black_hole_300_ghosts": black_hole_swarm,
+    "particle_storm": particle_storm,
+}
+
+
+def run_scenario(build, frames, renderer=None):
+    """Time ``frames`` frames after a short warm-up; return summary stats."""
+    sim, before_step = build()
+    timings = np.empty(frames, dtype=np.int64)
+    for frame in range(WARMUP_FRAMES + frames):
+        start = time.perf_counter_ns()
+        if before_step is not None:
+            before_step(frame)
+        sim.step(scripted_inputs(frame))
+        if renderer is not None:
+            renderer.draw(sim)
+            renderer.present()
+        if frame == 0:
+            first_ms = (time.perf_counter_ns() - start) / 1e6
+        if frame >= WARMUP_FRAMES:
+            timings[frame - WARMUP_FRAMES] = time.perf_counter_ns() - start
+
+    ms = timings / 1e6
+    p50, p95, p99 = np.percentile(ms, (50, 95, 99)).tolist()
+    return {
+        "frames": frames,
+        "first_frame_ms": first_ms,  # the first warm-up frame, which also pays for any swallows set off at spawn
+        "mean_ms": float(ms.mean()),
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+        "max_ms": float(ms.max()),
+        "frames_over_budget": int((ms > FRAME_BUDGET_MS).sum()),
+        "frames_per_second": frames / (ms.sum() / 1e3),
+        "final_bodies": len(sim.bodies),
+        "final_flares": len(sim.flares),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Return human-readable regressions of ``results`` against ``baseline``."""
+    regressions = []
+    for name, stats in results["scenarios"].items():
+        reference = baseline.get("scenarios", {}).get(name)
+        if reference is None:
+            continue
+        for key in COMPARED_STATS:
+            limit = reference[key] * (1 + threshold)
+            if stats[key] > limit:
+                regressions.append(
+                    f"{name}: {key} {stats[key]:.3f} ms > {reference[key]:.3f} ms baseline (+{threshold:.0%})"
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="run only this scenario (repeatable)")
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES, help="timed frames per scenario")
+    parser.add_argument("--no-render", action="store_true", help="time the simulation only")
+    parser.add_argument("--dirty-rects", action=argparse.BooleanOptionalAction, default=game.USE_DIRTY_RECTS,
+                        help="present only the drawn screen areas when rendering")
+    parser.add_argument("--output", metavar="PATH", help="write the results as JSON to PATH")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against an earlier JSON result")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed fractional slowdown of p50/p99 versus the baseline")
+    args = parser.parse_args(argv)
+
+    renderer = None
+    if not args.no_render:
+        pygame.init()
+        renderer = game.Renderer(pygame.display.set_mode((game.WIDTH, game.HEIGHT)), args.dirty_rects)
+
+    results = {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pygame": pygame.version.ver,
+            "machine": platform.machine(),
+            "rendered": renderer is not None,
+            "dirty_rects": renderer is not None and args.dirty_rects,
+        },
+        "scenarios": {},
+    }
+    for name in args.scenario or SCENARIOS:
+        stats = run_scenario(SCENARIOS[name], args.frames, renderer)
+        results["scenarios"][name] = stats
+        print(f"{name:26s} p50 {stats['p50_ms']:7.3f}  p95 {stats['p95_ms']:7.3f}  "
+              f"p99 {stats['p99_ms']:7.3f} ms  {stats['frames_per_second']:8.1f} frames/s  "
+              f"{stats['frames_over_budget']} over {FRAME_BUDGET_MS:.1f} ms")
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(results, handle, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        mismatched = [
+            f"{key} {baseline['environment'].get(key)!r} (now {results['environment'][key]!r})"
+            for key in MATCHED_ENVIRONMENT
+            if baseline["environment"].get(key) != results["environment"][key]
+        ]
+        if mismatched:
+            print(f"{args.baseline} was recorded with {', '.join(mismatched)}; "
+                  "rerun with matching options on the same setup to compare.")
+            return 2
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            return 1
+        print(f"No scenario regressed more than {args.threshold:.0%} against {args.baseline}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
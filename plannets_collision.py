@@ -1,16 +1,21 @@
 import pygame
 import random
 import math
+import heapq
+import argparse
+import csv
+import hashlib
+import marshal
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
 import numpy as np
 
-# Initialize Pygame
-pygame.init()
-pygame.mixer.init()
-
 # Screen dimensions
 WIDTH, HEIGHT = 1800, 1600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Solar System Eating Game - Player Controls Earth!")
 
 # Colors
 BLACK = (0, 0, 0)
@@ -41,12 +46,18 @@ MOON_GLOW_COLOR = (180, 200, 230)
 
 # Sun properties
 SUN_BASE_RADIUS = WIDTH // 15
-SUN_RADIUS = SUN_BASE_RADIUS
 SUN_POS = (WIDTH // 2, HEIGHT // 2)
 
 # Earth control settings
 EARTH_SPEED = 5.0
 
+# Per-frame input bits passed to Simulation.step
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_UP = 4
+INPUT_DOWN = 8
+INPUT_ADVANCE = 16  # SPACE pressed: next level or restart
+
 # Planet data
 PLANETS_DATA = [
     ("Mercury", 10, GRAY),
@@ -71,6 +82,10 @@ ESCAPE_ACCEL_BASE = 0.38
 ESCAPE_ACCEL_PER_LEVEL = 0.10
 ESCAPE_ACCEL_MAX = 1.60
 PLANET_MAX_SPEED = 4.0
+# Swallowing adds radii; growth stops here so radius sums and their squares
+# in the overlap tests stay inside int64 ((2 * 2 ** 30) ** 2 < 2 ** 63).
+MAX_BODY_RADIUS = 2 ** 30
+THREAT_GRID_CELL_SIZE = 128  # grid over planets and flares for the threat scan
 
 # Asteroid properties
 NUM_ASTEROIDS = 50
@@ -85,7 +100,16 @@ FLARE_SPAWN_CHANCE = 0.02  # 2% chance per frame
 FLARE_SPEED = 4
 SUN_IMPACT_FLARE_MULTIPLIER = 3.8
 SUN_IMPACT_BOOST_SECONDS = 5
-GAME_FPS = 60
+GAME_FPS = 60  # simulation ticks per second; every *_FRAMES constant counts ticks
+# Rendering runs at most this many frames per second, interpolating between
+# the last two simulation ticks; --fps-limit 0 renders uncapped.
+RENDER_FPS_LIMIT = GAME_FPS * 2
+# A slow frame runs at most this many catch-up ticks; the rest of the backlog
+# is dropped so one stall cannot snowball into ever longer frames.
+MAX_CATCH_UP_TICKS = 5
+# Rows that moved further than this in one tick (wormholes, respawns) are
+# drawn where they are instead of sliding across the screen.
+INTERPOLATION_SNAP_DISTANCE = 120
 SUN_IMPACT_BOOST_FRAMES = SUN_IMPACT_BOOST_SECONDS * GAME_FPS
 SUN_LIFECYCLE_SECONDS = 42
 SUN_AGE_MAX_FRAMES = SUN_LIFECYCLE_SECONDS * GAME_FPS
@@ -116,6 +140,7 @@ BLACK_HOLE_AMBIENCE_INTERVAL = 210
 BLACK_HOLE_GHOST_TRAIL_LENGTH = 9
 BLACK_HOLE_GHOST_ALPHA_MIN = 80
 BLACK_HOLE_GHOST_ALPHA_MAX = 200
+BLACK_HOLE_GHOST_ALPHA_BUCKET = 8  # ghost sprites are cached per this many alpha levels
 
 # Sun impact splash properties
 IMPACT_SPLASH_MIN = 44
@@ -139,6 +164,9 @@ PLANET_DEBRIS_SPEED_MAX = 7.5
 PLANET_DEBRIS_LIFETIME_MIN = 26
 PLANET_DEBRIS_LIFETIME_MAX = 58
 
+# Particle pools: spawns beyond capacity are dropped
+PARTICLE_POOL_CAPACITY = 4096
+
 # Moon shield properties
 MAX_MOONS = 3
 MOON_RADIUS = 5
@@ -146,6 +174,7 @@ MOON_ORBIT_GAP = 16
 MOON_ORBIT_SPEED_MIN = 0.01
 MOON_ORBIT_SPEED_MAX = 0.02
 MOON_SLOT_ANGLES = (-math.pi / 2, math.pi / 6, 5 * math.pi / 6)
+MOON_SLOT_OFFSETS = np.array(MOON_SLOT_ANGLES)
 MOON_DEBRIS_COUNT_MIN = 12
 MOON_DEBRIS_COUNT_MAX = 22
 MOON_DEBRIS_SPEED_MIN = 2.5
@@ -154,13 +183,80 @@ MOON_DEBRIS_LIFETIME_MIN = 18
 MOON_DEBRIS_LIFETIME_MAX = 36
 ASTEROIDS_PER_MOON = 5
 
-# Game level
-LEVEL = 1
-FLARE_FREQUENCY_MULTIPLIER = 1.0
-
 # Wormhole properties
 WORMHOLE_RADIUS = 45
 WORMHOLE_COOLDOWN_FRAMES = 60
+WORMHOLE_SPIN_SPEED = 0.05  # radians per frame
+# Portal animation is pre-rendered at this many evenly spaced angles per turn.
+WORMHOLE_ANIMATION_FRAMES = round(2 * math.pi / WORMHOLE_SPIN_SPEED)
+
+# Dirty-rectangle presentation: clear and update only what was drawn. Frames
+# with more rectangles than this are presented with a full flip instead.
+# The default for --dirty-rects / --no-dirty-rects.
+USE_DIRTY_RECTS = False
+DIRTY_RECT_LIMIT = 600
+
+# Replay files: header (magic, version, seed, start level, ticks per step,
+# step count, final state digest) followed by one zlib-compressed input
+# byte per step.
+REPLAY_MAGIC = b"PCRP"
+REPLAY_VERSION = 5
+REPLAY_HEADER = struct.Struct("<4sHQHHI20s")
+
+# World snapshots: header, fixed scalar block, both generators' states, then
+# every store as a row count followed by its columns' raw bytes.
+SNAPSHOT_MAGIC = b"PCSS"
+SNAPSHOT_VERSION = 2
+SNAPSHOT_HEADER = struct.Struct("<4sH")
+SNAPSHOT_SCALARS = struct.Struct("<QHd??iii?i?i?iii?iidd")
+SNAPSHOT_MT_WORDS = 625  # random.Random state: 624 Mersenne Twister words + position
+SNAPSHOT_PCG64 = struct.Struct("<16s16sII")
+SNAPSHOT_GAUSS = struct.Struct("<?d")
+SNAPSHOT_COUNT = struct.Struct("<I")
+
+# Rewind keeps up to this many seconds of per-tick snapshots, within a fixed
+# arena; larger worlds simply fit fewer seconds.
+REWIND_SECONDS = 5
+REWIND_BUFFER_BYTES = 48 * 1024 * 1024
+
+# Frame profiler: phases timed per rendered frame, summarized over a window.
+PROFILER_PHASES = (
+    "sun", "flare_spawn", "threat_ai", "ghosts", "movement", "wormholes",
+    "flare_update", "particles", "flare_collisions", "body_collisions",
+    "snapshot", "draw",
+)
+PROFILER_WINDOW_FRAMES = 120
+PROFILER_FRAME_BUDGET_MS = 1000 / 60
+
+# Synthesized sound buffers are cached here as .npy files, one per recipe.
+SOUND_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "plannets_collision", "sounds")
+# Sound events are played once per rendered frame on this many mixer channels.
+MIXER_CHANNELS = 16
+
+# Pixel bytes of pre-rendered Earth sprites kept, one per radius (least
+# recently used dropped); the newest is kept even if it alone is larger.
+EARTH_SPRITE_CACHE_BYTES = 64 * 2 ** 20
+# Faces, rings and Earth sprites are pre-rendered up to this radius; a body
+# grown past it covers the whole screen and is drawn as a plain disc.
+SPRITE_MAX_RADIUS = max(WIDTH, HEIGHT)
+
+# Asteroids up to this radius skip pygame.draw and are written straight into
+# the screen's pixels, all discs of one radius and colour in one array pass.
+ASTEROID_SPLAT_MAX_RADIUS = 8
+
+# Swallow broadphase: bodies up to this diameter are bucketed in a uniform grid,
+# anything bigger (planets, grown bodies) is tested directly against every body.
+SPATIAL_HASH_CELL_SIZE = ASTEROID_RADIUS * 4
+SPATIAL_HASH_HALF_STENCIL = ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1))
+# Below this many circles an all-pairs test is cheaper than building the grid.
+SPATIAL_HASH_BRUTE_FORCE_LIMIT = 96
+# Queries test every (query, item) pair at once while there are at most this many.
+SPATIAL_QUERY_BRUTE_FORCE_PAIRS = 20_000
+# Queries reaching past this many cells skip the grid and test every circle.
+SPATIAL_QUERY_WIDE_CELLS = 4
+# A body that grows past this many grid cells of reach finds its new
+# overlaps in a distance-sorted list of the crowd instead of the grid.
+SWALLOW_SORTED_REACH_CELLS = 8
 
 
 def get_initial_moon_count(name):
@@ -174,205 +270,1042 @@ def get_initial_moon_count(name):
 
 
 def get_initial_moon_slots(name):
-    return list(range(get_initial_moon_count(name)))
-
-
-def sync_moon_count(body):
-    body["moons"] = len(body.get("moon_slots", []))
-
-
-def add_moon_to_body(body):
-    moon_slots = body.setdefault("moon_slots", [])
-    if len(moon_slots) >= MAX_MOONS:
-        sync_moon_count(body)
-        return False
+    """Return the starting moon slots for a planet as a bitmask."""
+    return (1 << get_initial_moon_count(name)) - 1
+
+
+# Body kinds index BODY_NAMES; moods index PLANET_MOODS.
+BODY_NAMES = ("Asteroid",) + tuple(name for name, _, _ in PLANETS_DATA)
+ASTEROID_KIND = BODY_NAMES.index("Asteroid")
+EARTH_KIND = BODY_NAMES.index("Earth")
+SATURN_KIND = BODY_NAMES.index("Saturn")
+URANUS_KIND = BODY_NAMES.index("Uranus")
+PLANET_MOODS = ("neutral", "worried", "happy", "sleepy")
+DEFAULT_MOOD_ID = PLANET_MOODS.index(DEFAULT_PLANET_MOOD)
+WORRIED_MOOD_ID = PLANET_MOODS.index("worried")
+HAPPY_MOOD_ID = PLANET_MOODS.index("happy")
+
+# Position at the start of the current tick, kept for interpolated drawing.
+# Rows appended during a tick start as NaN and are drawn where they are.
+PREVIOUS_POSITION_FIELDS = (
+    ("prev_x", np.float64, ()),
+    ("prev_y", np.float64, ()),
+)
+
+# (field, dtype, per-row shape) for every BodyStore column.
+BODY_FIELDS = (
+    ("x", np.float64, ()),
+    ("y", np.float64, ()),
+    ("vx", np.float64, ()),
+    ("vy", np.float64, ()),
+    ("radius", np.int64, ()),
+    ("active", np.bool_, ()),
+    ("kind", np.int8, ()),
+    ("color", np.uint8, (3,)),
+    ("mood", np.int8, ()),
+    ("moon_slots", np.uint8, ()),          # bit n set -> moon in MOON_SLOT_ANGLES[n]
+    ("moon_progress", np.int16, ()),       # asteroids eaten toward the next moon
+    ("moon_angle", np.float64, ()),
+    ("moon_speed", np.float64, ()),
+    ("moon_dir", np.float64, (MAX_MOONS, 2)),  # (cos, sin) of each slot's orbit angle this tick
+    ("pulled", np.bool_, ()),              # caught by a black flare
+    ("pull_speed", np.float64, ()),
+    ("wh_cooldown", np.int32, ()),
+) + PREVIOUS_POSITION_FIELDS
+
+# Flare kinds: solar flares (including the collapse wave) and black-hole flares.
+FLARE_KIND_SOLAR = 0
+FLARE_KIND_BLACK = 1
+
+FLARE_FIELDS = (
+    ("x", np.float64, ()),
+    ("y", np.float64, ()),
+    ("vx", np.float64, ()),
+    ("vy", np.float64, ()),
+    ("radius", np.int64, ()),
+    ("active", np.bool_, ()),
+    ("kind", np.int8, ()),
+    ("color", np.uint8, (3,)),
+    ("lifetime", np.int32, ()),
+) + PREVIOUS_POSITION_FIELDS
+
+# Particle kinds: sun-impact plasma jets, sun-impact embers and body debris.
+PARTICLE_KIND_PLASMA = 0
+PARTICLE_KIND_EMBER = 1
+PARTICLE_KIND_DEBRIS = 2
+
+PARTICLE_FIELDS = (
+    ("x", np.float64, ()),
+    ("y", np.float64, ()),
+    ("vx", np.float64, ()),
+    ("vy", np.float64, ()),
+    ("drag", np.float64, ()),
+    ("radius", np.int32, ()),
+    ("lifetime", np.int32, ()),
+    ("max_life", np.int32, ()),
+    ("active", np.bool_, ()),
+    ("kind", np.int8, ()),
+    ("color", np.uint8, (3,)),
+) + PREVIOUS_POSITION_FIELDS
+
+GHOST_FIELDS = (
+    ("x", np.float64, ()),
+    ("y", np.float64, ()),
+    ("vx", np.float64, ()),
+    ("vy", np.float64, ()),
+    ("speed", np.float64, ()),
+    ("phase", np.float64, ()),
+    ("trail", np.float64, (BLACK_HOLE_GHOST_TRAIL_LENGTH, 2)),  # newest position last
+    ("trail_len", np.int16, ()),
+    ("active", np.bool_, ()),
+) + PREVIOUS_POSITION_FIELDS
+
+
+class ColumnStore:
+    """Rows stored as contiguous NumPy columns, one per entry in FIELDS.
+
+    Every column is exposed as an attribute sized to the live row count
+    (e.g. ``bodies.x``), so per-frame updates run as whole-array operations.
+    The attributes are views: update them in place. Rows whose ``active``
+    flag is cleared are dropped by ``compact``.
+    """
+
+    FIELDS = ()
+
+    def __init__(self, capacity=64):
+        self.count = 0
+        self._buffers = {
+            name: np.zeros((capacity,) + shape, dtype=dtype)
+            for name, dtype, shape in self.FIELDS
+        }
+        self._row_bytes = [
+            (name, np.dtype(dtype).itemsize * math.prod(shape)) for name, dtype, shape in self.FIELDS
+        ]
+        self._refresh_bytes()
+        self._refresh_views()
+
+    def __len__(self):
+        return self.count
+
+    def _refresh_views(self):
+        for name, buffer in self._buffers.items():
+            setattr(self, name, buffer[:self.count])
+
+    def _refresh_bytes(self):
+        # Flat byte views of every column, which ``unpack`` copies into.
+        self._bytes = {name: buffer.reshape(-1).view(np.uint8) for name, buffer in self._buffers.items()}
+
+    def _reserve(self, extra):
+        needed = self.count + extra
+        capacity = len(self._buffers["active"])
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        for name, buffer in self._buffers.items():
+            grown = np.zeros((capacity,) + buffer.shape[1:], dtype=buffer.dtype)
+            grown[:self.count] = buffer[:self.count]
+            self._buffers[name] = grown
+        self._refresh_bytes()
+
+    def append(self, count=1):
+        """Append ``count`` zeroed, active rows and return their slice."""
+        self._reserve(count)
+        rows = slice(self.count, self.count + count)
+        for buffer in self._buffers.values():
+            buffer[rows] = 0
+        for name, _, _ in PREVIOUS_POSITION_FIELDS:
+            self._buffers[name][rows] = np.nan
+        self.count += count
+        self._refresh_views()
+        self.active[rows] = True
+        return rows
+
+    def clear(self):
+        self.count = 0
+        self._refresh_views()
+
+    def pack(self, chunks):
+        """Append the row count and every column's live bytes to ``chunks``."""
+        chunks.append(SNAPSHOT_COUNT.pack(self.count))
+        for buffer in self._buffers.values():
+            chunks.append(buffer[:self.count].tobytes())
+
+    def unpack(self, data, offset):
+        """Load rows written by ``pack`` from the uint8 array ``data``; return the end offset.
+
+        Each column is one byte-slice copy out of ``data``; nothing is
+        decoded per column.
+        """
+        (count,) = SNAPSHOT_COUNT.unpack_from(data, offset)
+        offset += SNAPSHOT_COUNT.size
+        self.count = 0
+        self._reserve(count)
+        columns = self._bytes
+        for name, row_bytes in self._row_bytes:
+            end = offset + count * row_bytes
+            columns[name][:end - offset] = data[offset:end]
+            offset = end
+        self.count = count
+        self._refresh_views()
+        return offset
+
+    def remember_positions(self):
+        """Keep the current positions as the interpolation start of this tick."""
+        self.prev_x[:] = self.x
+        self.prev_y[:] = self.y
+
+    def drawn_positions(self, alpha):
+        """Return positions ``alpha`` of the way from the previous tick to now."""
+        dx = self.x - self.prev_x
+        dy = self.y - self.prev_y
+        # NaN (new rows) fails the comparison and snaps as well.
+        smooth = np.abs(dx) + np.abs(dy) <= INTERPOLATION_SNAP_DISTANCE
+        return (
+            np.where(smooth, self.prev_x + dx * alpha, self.x),
+            np.where(smooth, self.prev_y + dy * alpha, self.y),
+        )
 
+    def tick_displacement(self, snap=INTERPOLATION_SNAP_DISTANCE):
+        """Return each row's move this tick; new and teleported rows count as still.
+
+        Moves longer than ``snap`` count as teleports; a step of several
+        ticks should scale it to match.
+        """
+        dx = self.x - self.prev_x
+        dy = self.y - self.prev_y
+        still = ~(np.abs(dx) + np.abs(dy) <= snap)
+        dx[still] = 0.0
+        dy[still] = 0.0
+        return dx, dy
+
+    def compact(self):
+        """Drop inactive rows, keeping the survivors in their current order."""
+        keep = self.active.copy()
+        if keep.all():
+            return
+        kept = int(keep.sum())
+        for buffer in self._buffers.values():
+            buffer[:kept] = buffer[:self.count][keep]
+        self.count = kept
+        self._refresh_views()
+
+
+class BodyStore(ColumnStore):
+    """Planets and asteroids."""
+
+    FIELDS = BODY_FIELDS
+
+    def add(self, kind, x, y, vx, vy, radius, color):
+        """Append active bodies; every argument may also be an array for a batch."""
+        rows = self.append(np.size(x))
+        self.kind[rows] = kind
+        self.x[rows] = x
+        self.y[rows] = y
+        self.vx[rows] = vx
+        self.vy[rows] = vy
+        self.radius[rows] = radius
+        self.color[rows] = color
+        self.mood[rows] = DEFAULT_MOOD_ID
+        return rows
+
+    def planet_mask(self):
+        """Active, non-asteroid rows."""
+        return self.active & (self.kind != ASTEROID_KIND)
+
+
+class FlareStore(ColumnStore):
+    """Solar, collapse and black-hole flares."""
+
+    FIELDS = FLARE_FIELDS
+
+    def add(self, x, y, vx, vy, radius, color, lifetime, kind=FLARE_KIND_SOLAR):
+        """Append one flare; every argument may also be an array for a batch."""
+        rows = self.append(np.size(x))
+        self.x[rows] = x
+        self.y[rows] = y
+        self.vx[rows] = vx
+        self.vy[rows] = vy
+        self.radius[rows] = radius
+        self.color[rows] = color
+        self.lifetime[rows] = lifetime
+        self.kind[rows] = kind
+        return rows
+
+
+class ParticlePool(ColumnStore):
+    """Fixed-capacity particles, integrated and retired as whole arrays.
+
+    Spawns that do not fit are dropped, so a chain of impacts costs at most
+    one pool's worth of work. Dead particles are swap-removed: survivors
+    from the tail fill the holes, so draw order is not preserved.
+    """
+
+    FIELDS = PARTICLE_FIELDS
+
+    def __init__(self, capacity=PARTICLE_POOL_CAPACITY):
+        super().__init__(capacity)
+        self.capacity = capacity
+
+    def spawn(self, x, y, angles, speeds, radius, lifetime, drag, color, kind=PARTICLE_KIND_DEBRIS):
+        """Emit a burst from (x, y); per-particle arguments are arrays."""
+        count = min(len(angles), self.capacity - self.count)
+        if count <= 0:
+            return
+        rows = self.append(count)
+        self.x[rows] = x
+        self.y[rows] = y
+        self.vx[rows] = np.cos(angles[:count]) * speeds[:count]
+        self.vy[rows] = np.sin(angles[:count]) * speeds[:count]
+        self.radius[rows] = radius[:count]
+        self.lifetime[rows] = lifetime[:count]
+        self.max_life[rows] = lifetime[:count]
+        self.drag[rows] = drag[:count]
+        self.color[rows] = color[:count]
+        self.kind[rows] = kind
+
+    def update(self):
+        self.x += self.vx
+        self.y += self.vy
+        self.vx *= self.drag
+        self.vy *= self.drag
+        self.lifetime -= 1
+        self.active &= self.lifetime > 0
+        self.compact()
+
+    def compact(self):
+        """Drop inactive rows by moving live rows from the tail into the gaps."""
+        dead = np.nonzero(~self.active)[0]
+        if not dead.size:
+            return
+        kept = self.count - dead.size
+        holes = dead[dead < kept]
+        movers = kept + np.nonzero(self.active[kept:])[0]
+        for buffer in self._buffers.values():
+            buffer[holes] = buffer[movers]
+        self.count = kept
+        self._refresh_views()
+
+
+class GhostStore(ColumnStore):
+    """Black hole ghosts and their position trails."""
+
+    FIELDS = GHOST_FIELDS
+
+    def add(self, x, y, speed, phase):
+        """Append one ghost at rest; every argument may also be an array."""
+        rows = self.append(np.size(x))
+        self.x[rows] = x
+        self.y[rows] = y
+        self.speed[rows] = speed
+        self.phase[rows] = phase
+        return rows
+
+    def push_trail(self, rows):
+        """Record the current position of ``rows`` as the newest trail point."""
+        trail = self.trail[rows]
+        trail[:, :-1] = trail[:, 1:]
+        trail[:, -1, 0] = self.x[rows]
+        trail[:, -1, 1] = self.y[rows]
+        self.trail[rows] = trail
+        self.trail_len[rows] = np.minimum(self.trail_len[rows] + 1, BLACK_HOLE_GHOST_TRAIL_LENGTH)
+
+
+def moon_count(bodies, index):
+    return bin(int(bodies.moon_slots[index])).count("1")
+
+
+def add_moon_to_body(bodies, index):
+    moon_slots = int(bodies.moon_slots[index])
     for slot_id in range(MAX_MOONS):
-        if slot_id not in moon_slots:
-            moon_slots.append(slot_id)
-            moon_slots.sort()
-            sync_moon_count(body)
+        if not moon_slots & (1 << slot_id):
+            bodies.moon_slots[index] = moon_slots | (1 << slot_id)
             return True
-
-    sync_moon_count(body)
     return False
 
 
-def remove_moon_from_body(body, slot_id):
-    moon_slots = body.get("moon_slots", [])
-    if slot_id in moon_slots:
-        moon_slots.remove(slot_id)
-        sync_moon_count(body)
+def remove_moon_from_body(bodies, index, slot_id):
+    moon_slots = int(bodies.moon_slots[index])
+    if moon_slots & (1 << slot_id):
+        bodies.moon_slots[index] = moon_slots & ~(1 << slot_id)
         return True
     return False
 
 
-def handle_asteroid_eat(body):
-    if body.get("name") == "Asteroid":
+def handle_asteroid_eat(bodies, index):
+    if bodies.kind[index] == ASTEROID_KIND:
         return
 
-    if len(body.get("moon_slots", [])) >= MAX_MOONS:
-        body["asteroids_eaten_toward_moon"] = 0
+    if moon_count(bodies, index) >= MAX_MOONS:
+        bodies.moon_progress[index] = 0
         return
 
-    progress = body.get("asteroids_eaten_toward_moon", 0) + 1
+    progress = int(bodies.moon_progress[index]) + 1
     if progress >= ASTEROIDS_PER_MOON:
-        gained = add_moon_to_body(body)
+        gained = add_moon_to_body(bodies, index)
         progress = 0 if gained else progress
-    body["asteroids_eaten_toward_moon"] = progress
+    bodies.moon_progress[index] = progress
 
 
-def get_moon_positions(body):
-    moon_slots = body.get("moon_slots", [])
+def update_moon_directions(bodies, rows):
+    """Cache the orbit direction of every moon slot after ``moon_angle`` moves.
+
+    Bodies still move and grow later in the tick, so the cache holds unit
+    directions rather than world positions; ``moon_offsets`` scales them.
+    """
+    angles = bodies.moon_angle[rows][:, None] + MOON_SLOT_OFFSETS
+    bodies.moon_dir[rows, :, 0] = np.cos(angles)
+    bodies.moon_dir[rows, :, 1] = np.sin(angles)
+
+
+def moon_offsets(bodies, rows):
+    """Return ``(dx, dy)`` arrays of shape (len(rows), MAX_MOONS) from each body's center."""
+    orbit = (bodies.radius[rows] + MOON_ORBIT_GAP)[:, None]
+    direction = bodies.moon_dir[rows]
+    return direction[:, :, 0] * orbit, direction[:, :, 1] * orbit
+
+
+def get_moon_positions(bodies, index):
+    """Return ``(slot_id, x, y)`` for each moon orbiting the body, by slot."""
+    moon_slots = int(bodies.moon_slots[index])
     if not moon_slots:
         return []
 
-    orbit_radius = body["radius"] + MOON_ORBIT_GAP
-    base_angle = body.get("moon_orbit_angle", 0.0)
-    positions = []
-
-    for slot_id in moon_slots:
-        angle = base_angle + MOON_SLOT_ANGLES[slot_id]
-        positions.append({
-            "slot_id": slot_id,
-            "pos": [
-                body["pos"][0] + math.cos(angle) * orbit_radius,
-                body["pos"][1] + math.sin(angle) * orbit_radius,
-            ],
-        })
-
-    return positions
-
-
-def create_body(name, radius, color, is_asteroid=False):
-    if is_asteroid:
-        distance = random.uniform(150, 250)
-        angle = random.uniform(0, 2 * math.pi)
-        pos = (
-            SUN_POS[0] + distance * math.cos(angle),
-            SUN_POS[1] + distance * math.sin(angle)
+    orbit_radius = int(bodies.radius[index]) + MOON_ORBIT_GAP
+    x, y = float(bodies.x[index]), float(bodies.y[index])
+    directions = bodies.moon_dir[index].tolist()
+    return [
+        (slot_id, x + directions[slot_id][0] * orbit_radius, y + directions[slot_id][1] * orbit_radius)
+        for slot_id in range(MAX_MOONS)
+        if moon_slots & (1 << slot_id)
+    ]
+
+
+def spawn_planets(bodies, np_rng, sun_radius=SUN_BASE_RADIUS):
+    """Append every planet in PLANETS_DATA at once, clear of the sun."""
+    names = [name for name, _, _ in PLANETS_DATA]
+    count = len(names)
+    radii = np.array([radius for _, radius, _ in PLANETS_DATA])
+    x = np.empty(count)
+    y = np.empty(count)
+
+    # Special positioning for Earth: upper middle section
+    earth = np.array([name == "Earth" for name in names])
+    x[earth] = WIDTH // 2 + np_rng.integers(-80, 81, int(earth.sum()))
+    y[earth] = np_rng.integers(200, 351, int(earth.sum()))
+
+    # Avoid spawning too close to sun: redraw only the planets that landed there.
+    pending = np.nonzero(~earth)[0]
+    while pending.size:
+        x[pending] = np_rng.integers(50, WIDTH - 49, pending.size)
+        y[pending] = np_rng.integers(50, HEIGHT - 49, pending.size)
+        dist = np.hypot(x[pending] - SUN_POS[0], y[pending] - SUN_POS[1])
+        pending = pending[dist <= sun_radius + radii[pending] + 20]
+
+    rows = bodies.add(
+        [BODY_NAMES.index(name) for name in names], x, y,
+        np_rng.uniform(-2, 2, count), np_rng.uniform(-2, 2, count),
+        radii, [color for _, _, color in PLANETS_DATA],
+    )
+    bodies.moon_slots[rows] = [get_initial_moon_slots(name) for name in names]
+    bodies.moon_angle[rows] = np_rng.uniform(0, 2 * math.pi, count)
+    bodies.moon_speed[rows] = np_rng.uniform(MOON_ORBIT_SPEED_MIN, MOON_ORBIT_SPEED_MAX, count)
+    update_moon_directions(bodies, rows)
+    return rows
+
+
+def spawn_asteroid_field(bodies, np_rng, count):
+    """Append ``count`` asteroids in a ring around the sun in one batch."""
+    distance = np_rng.uniform(150, 250, count)
+    angle = np_rng.uniform(0, 2 * math.pi, count)
+    return bodies.add(
+        ASTEROID_KIND,
+        SUN_POS[0] + distance * np.cos(angle),
+        SUN_POS[1] + distance * np.sin(angle),
+        np_rng.uniform(-2, 2, count), np_rng.uniform(-2, 2, count),
+        ASTEROID_RADIUS, ASTEROID_COLOR,
+    )
+
+
+def spawn_level_bodies(bodies, np_rng, level):
+    """Fill ``bodies`` with the planets and the asteroid field for ``level``."""
+    bodies.clear()
+    spawn_planets(bodies, np_rng)
+    spawn_asteroid_field(bodies, np_rng, min(int(NUM_ASTEROIDS * (1.5 ** (level - 1))), MAX_ASTEROIDS))
+
+
+def sweep_contact(end_x, end_y, move_x, move_y, radius):
+    """Return when two circles moving in straight lines first touched this tick.
+
+    ``end`` is the offset between the centres after the move and ``move``
+    how much that offset changed during it. The result is the fraction of
+    the move, in [0, 1], at which the centres came within ``radius``, or
+    ``inf`` if they never did. Arrays broadcast; fast movers can no longer
+    pass through thin targets between two discrete overlap tests.
+    """
+    start_x = end_x - move_x
+    start_y = end_y - move_y
+    a = move_x * move_x + move_y * move_y
+    b = start_x * move_x + start_y * move_y
+    c = start_x * start_x + start_y * start_y - radius * radius
+    disc = b * b - a * c
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = (-b - np.sqrt(disc)) / a
+    toi = np.where(c < 0, 0.0, np.where((disc >= 0) & (t >= 0) & (t <= 1), t, np.inf))
+    # The end-of-move overlap stays exact, so every discrete hit is kept.
+    end_hit = end_x * end_x + end_y * end_y < radius * radius
+    return np.where(end_hit, np.minimum(toi, 1.0), toi)
+
+
+class SpatialGrid:
+    """Uniform grid over circle centres, rebuilt whenever positions change.
+
+    Circles with a diameter up to ``cell_size`` are bucketed by centre and
+    only meet circles in nearby cells; larger ones (planets, grown bodies)
+    are kept in ``large`` and tested directly. Small sets skip the grid and
+    test every pair at once.
+    """
+
+    def __init__(self, xs, ys, radii, cell_size=SPATIAL_HASH_CELL_SIZE):
+        self.xs = xs
+        self.ys = ys
+        self.radii = radii
+        self.cell_size = cell_size
+        self.brute_force = len(xs) <= SPATIAL_HASH_BRUTE_FORCE_LIMIT
+        if self.brute_force:
+            return
+        small = radii * 2 <= cell_size
+        self.small = np.nonzero(small)[0]
+        self.large = np.nonzero(~small)[0]
+        if not self.small.size:
+            return
+
+        cell_x = np.floor(xs[self.small] / cell_size).astype(np.int64)
+        cell_y = np.floor(ys[self.small] / cell_size).astype(np.int64)
+        # One empty cell of padding on every side keeps neighbour lookups in range.
+        self.origin_x = int(cell_x.min()) - 1
+        self.origin_y = int(cell_y.min()) - 1
+        cell_x -= self.origin_x
+        cell_y -= self.origin_y
+        self.columns = int(cell_x.max()) + 2
+        self.rows = int(cell_y.max()) + 2
+        keys = cell_x * self.rows + cell_y
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+        # cell_start[key] .. cell_start[key + 1] is that cell's run in `order`.
+        self.cell_start = np.zeros(self.columns * self.rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys, minlength=self.columns * self.rows), out=self.cell_start[1:])
+
+    def _cell_members(self, sources, cell_x, cell_y, last_y=None):
+        """Pair each source with every small circle in its given cell.
+
+        With ``last_y`` each source covers the run of cells from ``cell_y``
+        to ``last_y`` in its column, whose keys are consecutive.
+        """
+        if last_y is None:
+            last_y = cell_y
+        else:
+            cell_y = np.maximum(cell_y, 0)
+            last_y = np.minimum(last_y, self.rows - 1)
+        inside = (cell_x >= 0) & (cell_x < self.columns) & (cell_y >= 0) & (last_y < self.rows) & (cell_y <= last_y)
+        sources = sources[inside]
+        column = cell_x[inside] * self.rows
+        lo = self.cell_start[column + cell_y[inside]]
+        counts = self.cell_start[column + last_y[inside] + 1] - lo
+        total = int(counts.sum())
+        src = np.repeat(sources, counts)
+        positions = np.arange(total) + np.repeat(lo - (np.cumsum(counts) - counts), counts)
+        return src, self.small[self.order[positions]]
+
+    def overlapping_pairs(self):
+        """Return every overlapping (i, j) index pair with i < j, sorted by (i, j)."""
+        xs, ys, radii = self.xs, self.ys, self.radii
+        if self.brute_force:
+            hits = self._all_pairs(xs, ys, radii)
+            return np.nonzero(np.triu(hits, 1))
+        firsts, seconds = [], []
+
+        # Small circles only overlap circles whose centre is in a neighbouring cell.
+        if self.small.size > 1:
+            sources = self.small[self.order]
+            cell_x = self.sorted_keys // self.rows
+            cell_y = self.sorted_keys % self.rows
+            for dx, dy in SPATIAL_HASH_HALF_STENCIL:
+                src, dst = self._cell_members(sources, cell_x + dx, cell_y + dy)
+                if dx == 0 and dy == 0:
+                    keep = src < dst
+                    src, dst = src[keep], dst[keep]
+                firsts.append(src)
+                seconds.append(dst)
+
+        for k in self.large.tolist():
+            dx = xs - xs[k]
+            dy = ys - ys[k]
+            sum_r = radii + radii[k]
+            hit = dx * dx + dy * dy < sum_r * sum_r
+            hit[k] = False
+            others = np.nonzero(hit)[0]
+            firsts.append(np.full(others.size, k, dtype=np.int64))
+            seconds.append(others)
+
+        return self._exact_pairs(firsts, seconds, xs, ys, radii, normalize=True)
+
+    def query(self, qx, qy, qr):
+        """Return (query, item) index pairs of overlapping circles, sorted."""
+        if self.brute_force or len(qx) * len(self.xs) <= SPATIAL_QUERY_BRUTE_FORCE_PAIRS:
+            return np.nonzero(self._all_pairs(qx, qy, qr))
+        firsts, seconds = [], []
+
+        wide = self.wide_queries(qr)
+        sources = np.nonzero(~wide)[0]
+        if self.small.size and sources.size:
+            # Each query covers a run of rows in every column its square reaches.
+            cell = self.cell_size
+            reach = qr[sources] + cell / 2
+            lo_x = np.floor((qx[sources] - reach) / cell).astype(np.int64) - self.origin_x
+            hi_x = np.floor((qx[sources] + reach) / cell).astype(np.int64) - self.origin_x
+            lo_y = np.floor((qy[sources] - reach) / cell).astype(np.int64) - self.origin_y
+            hi_y = np.floor((qy[sources] + reach) / cell).astype(np.int64) - self.origin_y
+            for dx in range(int((hi_x - lo_x).max()) + 1):
+                covers = lo_x + dx <= hi_x
+                src, dst = self._cell_members(sources[covers], lo_x[covers] + dx, lo_y[covers], hi_y[covers])
+                firsts.append(src)
+                seconds.append(dst)
+        for q in np.nonzero(wide)[0].tolist():
+            dx = self.xs[self.small] - qx[q]
+            dy = self.ys[self.small] - qy[q]
+            sum_r = self.radii[self.small] + qr[q]
+            hits = self.small[dx * dx + dy * dy < sum_r * sum_r]
+            firsts.append(np.full(hits.size, q, dtype=np.int64))
+            seconds.append(hits)
+
+        for k in self.large.tolist():
+            dx = qx - self.xs[k]
+            dy = qy - self.ys[k]
+            sum_r = qr + self.radii[k]
+            hits = np.nonzero(dx * dx + dy * dy < sum_r * sum_r)[0]
+            firsts.append(hits)
+            seconds.append(np.full(hits.size, k, dtype=np.int64))
+
+        return self._exact_pairs(firsts, seconds, qx, qy, qr)
+
+    def wide_queries(self, qr):
+        """Flag the query radii that reach too many cells for the grid.
+
+        Those queries are tested against every circle directly, so one
+        grown body does not stretch the column loop of all the others.
+        """
+        return qr > self.cell_size * SPATIAL_QUERY_WIDE_CELLS
+
+    def near(self, x, y, reach):
+        """Return every circle whose centre may lie within ``reach`` of (x, y).
+
+        Small circles come from the cells that the square around the point
+        covers, large ones are always included; callers test the distance.
+        """
+        if self.brute_force:
+            return np.arange(len(self.xs))
+        found = [self.large]
+        if self.small.size:
+            cell = self.cell_size
+            lo_x = max(math.floor((x - reach) / cell) - self.origin_x, 0)
+            hi_x = min(math.floor((x + reach) / cell) - self.origin_x, self.columns - 1)
+            lo_y = max(math.floor((y - reach) / cell) - self.origin_y, 0)
+            hi_y = min(math.floor((y + reach) / cell) - self.origin_y, self.rows - 1)
+            if lo_y <= hi_y:
+                # The cells of one grid column are consecutive keys, so each is one run.
+                for column in range(lo_x, hi_x + 1):
+                    key = column * self.rows
+                    run = self.order[self.cell_start[key + lo_y]:self.cell_start[key + hi_y + 1]]
+                    found.append(self.small[run])
+        return np.concatenate(found)
+
+    def _all_pairs(self, qx, qy, qr):
+        dx = qx[:, None] - self.xs[None, :]
+        dy = qy[:, None] - self.ys[None, :]
+        sum_r = qr[:, None] + self.radii[None, :]
+        return dx * dx + dy * dy < sum_r * sum_r
+
+    def _exact_pairs(self, firsts, seconds, first_x, first_y, first_r, normalize=False):
+        empty = np.zeros(0, dtype=np.int64)
+        if not firsts:
+            return empty, empty
+        first = np.concatenate(firsts)
+        second = np.concatenate(seconds)
+        if normalize:
+            first, second = np.minimum(first, second), np.maximum(first, second)
+        dx = first_x[first] - self.xs[second]
+        dy = first_y[first] - self.ys[second]
+        sum_r = first_r[first] + self.radii[second]
+        hit = dx * dx + dy * dy < sum_r * sum_r
+        stride = len(self.xs)
+        pair_keys = first[hit] * stride + second[hit]
+        # Two large circles find each other twice; query results never repeat.
+        pair_keys = np.unique(pair_keys) if normalize else np.sort(pair_keys)
+        return pair_keys // stride, pair_keys % stride
+
+
+class TargetIndex:
+    """Circles that hunters chase and capture, indexed for batched queries.
+
+    Built once per frame from a set of body rows. Every hunter asks for its
+    nearest target and for the first target it overlaps in a single array
+    pass; captured targets are retired with ``remove`` so later queries
+    skip them.
+    """
+
+    def __init__(self, bodies, rows):
+        self.rows = rows
+        self.x = bodies.x[rows]
+        self.y = bodies.y[rows]
+        self.radii = bodies.radius[rows]
+        self.live = np.arange(len(rows))
+
+    def __len__(self):
+        return len(self.live)
+
+    def nearest(self, qx, qy):
+        """Return each query's nearest target slot and the offset to it.
+
+        Ties go to the lowest slot, i.e. the lowest body row.
+        """
+        dx = self.x[self.live][None, :] - qx[:, None]
+        dy = self.y[self.live][None, :] - qy[:, None]
+        best = np.argmin(dx * dx + dy * dy, axis=1)
+        picked = np.arange(len(qx))
+        return self.live[best], dx[picked, best], dy[picked, best]
+
+    def first_contact(self, qx, qy, qr, move_x, move_y):
+        """Return the target slot each query touched first on its move, or -1.
+
+        Queries end at ``(qx, qy)`` after moving by ``(move_x, move_y)``;
+        simultaneous contacts go to the lowest slot.
+        """
+        toi = sweep_contact(
+            qx[:, None] - self.x[self.live][None, :], qy[:, None] - self.y[self.live][None, :],
+            move_x[:, None], move_y[:, None], qr + self.radii[self.live][None, :],
         )
-    else:
-        # Special positioning for Earth: upper middle section
-        if name == "Earth":
-            pos = (WIDTH // 2 + random.randint(-80, 80), random.randint(200, 350))
+        best = np.argmin(toi, axis=1)
+        touched = np.isfinite(toi[np.arange(len(qx)), best])
+        return np.where(touched, self.live[best], -1)
+
+    def remove(self, slot):
+        self.live = self.live[self.live != slot]
+
+
+def swallow(bodies, eater, eaten, events):
+    """Let row ``eater`` absorb row ``eaten``'s radius and award moon progress.
+
+    The grown radius is clamped to MAX_BODY_RADIUS.
+    """
+    bodies.radius[eater] = min(MAX_BODY_RADIUS, int(bodies.radius[eater]) + int(bodies.radius[eaten]))
+    if bodies.kind[eater] != ASTEROID_KIND:
+        if bodies.kind[eaten] == ASTEROID_KIND:
+            handle_asteroid_eat(bodies, eater)
         else:
-            # Avoid spawning too close to sun
-            while True:
-                pos = (random.randint(50, WIDTH - 50), random.randint(50, HEIGHT - 50))
-                dist = math.hypot(pos[0] - SUN_POS[0], pos[1] - SUN_POS[1])
-                if dist > SUN_RADIUS + radius + 20:
-                    break
-
-    vel = (random.uniform(-2, 2), random.uniform(-2, 2))
-    body = {"name": name, "pos": list(pos), "vel": list(vel), "radius": radius, "color": color, "active": True}
-    if not is_asteroid:
-        body["moon_slots"] = get_initial_moon_slots(name)
-        body["asteroids_eaten_toward_moon"] = 0
-        body["moon_orbit_angle"] = random.uniform(0, 2 * math.pi)
-        body["moon_orbit_speed"] = random.uniform(MOON_ORBIT_SPEED_MIN, MOON_ORBIT_SPEED_MAX)
-        sync_moon_count(body)
-    return body
-
-
-# Create planets and asteroids
-bodies = [create_body(name, radius, color) for name, radius, color in PLANETS_DATA]
-num_asteroids = min(int(NUM_ASTEROIDS * (1.5 ** (LEVEL - 1))), MAX_ASTEROIDS)
-for _ in range(num_asteroids):
-    bodies.append(create_body("Asteroid", ASTEROID_RADIUS, ASTEROID_COLOR, is_asteroid=True))
-
-# Flares list
-flares = []
-
-# Two connected wormhole portals
-wormholes = [
-    {"pos": [200, 200],             "color": (160, 0, 255),  "angle": 0.0},
-    {"pos": [WIDTH - 200, HEIGHT - 200], "color": (0, 220, 255), "angle": 0.0},
-]
+            add_moon_to_body(bodies, eater)
+    bodies.active[eaten] = False
+    events.append("swallow")
+
+
+def resolve_swallows(bodies, events, dt=1):
+    """Resolve body-vs-body swallowing among the currently active bodies.
+
+    Gives the same result as checking every (i, j) pair of active bodies in
+    index order, but only visits pairs that can swallow. Equal radii never
+    swallow, so pairs inside the crowd of bodies sharing the most common
+    radius (the asteroids) are never listed; only pairs with unequal radii
+    are queued up front. Positions are fixed and radii only grow inside this
+    pass, so whenever a body grows only the pairs it newly overlaps, or
+    overlapped while the radii were still equal, are queued, and only if the
+    ordered scan would still reach them. Small growers look those up in the
+    crowd's grid; large ones walk a list of the crowd sorted by distance,
+    built once per body, so long swallow chains stay linear. ``dt`` is the
+    number of ticks the last step covered.
+    """
+    rows = np.nonzero(bodies.active)[0]
+    count = rows.size
+    if count < 2:
+        return
 
+    xs = bodies.x[rows]
+    ys = bodies.y[rows]
+    radii = bodies.radius[rows]
+    if radii.min() == radii.max():
+        # Equal radii never swallow; a field of asteroids alone has no pairs.
+        return
+    pulled = np.nonzero(bodies.pulled[rows])[0]
+    move_x, move_y = bodies.tick_displacement(INTERPOLATION_SNAP_DISTANCE * dt)
+    move_x, move_y = move_x[rows], move_y[rows]
+    rows = rows.tolist()
+
+    values, sizes = np.unique(radii, return_counts=True)
+    crowd_radius = int(values[np.argmax(sizes)])
+    in_crowd = radii == crowd_radius
+    crowd = np.nonzero(in_crowd)[0]
+    others = np.nonzero(~in_crowd)[0]
+    grid = SpatialGrid(xs[crowd], ys[crowd], radii[crowd], max(SPATIAL_HASH_CELL_SIZE, 2 * crowd_radius))
+
+    pair_keys = []
+    if others.size:
+        hunter, prey = grid.query(xs[others], ys[others], radii[others])
+        hunter, prey = others[hunter], crowd[prey]
+        pair_keys.append(np.minimum(hunter, prey) * count + np.maximum(hunter, prey))
+        first, second = SpatialGrid(xs[others], ys[others], radii[others]).overlapping_pairs()
+        first, second = others[first], others[second]
+        unequal = radii[first] != radii[second]
+        pair_keys.append(first[unequal] * count + second[unequal])
+    parked = {}
+    if pulled.size:
+        # Pulled bodies move fast enough to pass small bodies between ticks,
+        # so they also meet everything their sweep touched on the way.
+        toi = sweep_contact(
+            xs[pulled][:, None] - xs[None, :], ys[pulled][:, None] - ys[None, :],
+            move_x[pulled][:, None] - move_x[None, :], move_y[pulled][:, None] - move_y[None, :],
+            radii[pulled][:, None] + radii[None, :],
+        )
+        toi[np.arange(pulled.size), pulled] = np.inf
+        sweeper, other = np.nonzero(np.isfinite(toi))
+        sweeper = pulled[sweeper]
+        first, second = np.minimum(sweeper, other), np.maximum(sweeper, other)
+        unequal = radii[first] != radii[second]
+        pair_keys.append(first[unequal] * count + second[unequal])
+        # Swept pairs are not overlaps a grown body would find again, so the
+        # equal ones are parked per body until one side grows.
+        for a, b in zip(first[~unequal].tolist(), second[~unequal].tolist()):
+            parked.setdefault(a, []).append((a, b))
+            parked.setdefault(b, []).append((a, b))
+    pair_keys = np.unique(np.concatenate(pair_keys)) if pair_keys else np.zeros(0, dtype=np.int64)
+    # Sorted pairs already form a valid heap.
+    queue = list(zip((pair_keys // count).tolist(), (pair_keys % count).tolist()))
+    loose = others.tolist()  # bodies the crowd grid does not describe
+    loose_array = [others]
+    by_distance = {}  # grower -> (crowd sorted by squared distance, those distances)
+    sorted_reach = SWALLOW_SORTED_REACH_CELLS * grid.cell_size
+
+    def crowd_near(k, old_radius):
+        """Crowd members that may overlap ``k`` now but did not before with unequal radii."""
+        reach = radii[k] + crowd_radius
+        if reach <= sorted_reach:
+            return crowd[grid.near(xs[k], ys[k], reach)]
+        if k not in by_distance:
+            dist_sq = (xs[crowd] - xs[k]) ** 2 + (ys[crowd] - ys[k]) ** 2
+            order = np.argsort(dist_sq, kind="stable")
+            by_distance[k] = crowd[order], dist_sq[order]
+        members, dist_sq = by_distance[k]
+        lo, hi = dist_sq.searchsorted(((old_radius + crowd_radius) ** 2, reach * reach)).tolist()
+        if old_radius == crowd_radius:
+            lo = 0
+        return members[lo:hi]
+
+    def queue_new_overlaps(k, current_pair):
+        for pair in parked.pop(k, ()):
+            if pair > current_pair:
+                heapq.heappush(queue, pair)
+
+        old_radius = radii[k]
+        radii[k] = bodies.radius[rows[k]]
+        if in_crowd[k]:
+            in_crowd[k] = False
+            loose.append(k)
+        if len(loose) != loose_array[0].size:
+            loose_array[0] = np.array(loose, dtype=np.int64)
+        near = crowd_near(k, old_radius)
+        near = np.concatenate((near[in_crowd[near]], loose_array[0]))
+        dx = xs[near] - xs[k]
+        dy = ys[near] - ys[k]
+        dist_sq = dx * dx + dy * dy
+        old_sum = radii[near] + old_radius
+        new_sum = radii[near] + radii[k]
+        # Pairs that overlapped with unequal radii are already queued.
+        fresh = (dist_sq < new_sum * new_sum) & ((dist_sq >= old_sum * old_sum) | (radii[near] == old_radius))
+        for m in near[fresh].tolist():
+            if m != k:
+                pair = (m, k) if m < k else (k, m)
+                if pair > current_pair:
+                    heapq.heappush(queue, pair)
+
+    last_pair = None
+    while queue:
+        pair = heapq.heappop(queue)
+        if pair == last_pair:
+            continue
+        last_pair = pair
+        b1 = rows[pair[0]]
+        b2 = rows[pair[1]]
+        if bodies.radius[b1] > bodies.radius[b2]:
+            swallow(bodies, b1, b2, events)
+            queue_new_overlaps(pair[0], pair)
+        elif bodies.radius[b2] > bodies.radius[b1]:
+            swallow(bodies, b2, b1, events)
+            queue_new_overlaps(pair[1], pair)
+        # Equal size: both survive
+
+
+def resolve_flare_hits(bodies, flares, np_rng, debris, events, dt=1):
+    """Apply this tick's flare hits on bodies and their moons.
+
+    Flares and bodies are swept along this tick's moves, so a flare hits
+    whatever it touched on the way rather than only what it overlaps at the
+    end. Candidate flare/body pairs come from one grid query and every moon
+    position is computed once. Each flare meets its candidates in order of
+    contact time, with the usual priority: black-flare capture, moon shield,
+    body. Spent flares are only flagged inactive; the caller compacts the
+    store. Debris is emitted into the ``debris`` pool and sound names to
+    ``events``. ``dt`` is the number of ticks the last step covered.
+    """
+    live = np.nonzero(flares.active)[0]
+    targets = np.nonzero(bodies.active & ~bodies.pulled)[0]
+    if not live.size or not targets.size:
+        return
 
-def check_collision(body1, body2):
-    dx = body1["pos"][0] - body2["pos"][0]
-    dy = body1["pos"][1] - body2["pos"][1]
-    dist_sq = dx * dx + dy * dy
-    sum_r = body1["radius"] + body2["radius"]
-    return dist_sq < sum_r * sum_r
+    # Reach covers the body, its sweep and, for planets with moons, the moon orbit.
+    body_move_x, body_move_y = bodies.tick_displacement(INTERPOLATION_SNAP_DISTANCE * dt)
+    shielded = (bodies.kind[targets] != ASTEROID_KIND) & (bodies.moon_slots[targets] != 0)
+    reach = (
+        bodies.radius[targets] + np.where(shielded, MOON_ORBIT_GAP + MOON_RADIUS, 0)
+        + np.hypot(body_move_x[targets], body_move_y[targets])
+    )
+    grid = SpatialGrid(bodies.x[targets], bodies.y[targets], reach)
+    # Each flare is queried as the circle around its whole path.
+    flare_move_x = flares.vx * dt
+    flare_move_y = flares.vy * dt
+    pair_flares, pair_targets = grid.query(
+        flares.x[live] - flare_move_x[live] / 2, flares.y[live] - flare_move_y[live] / 2,
+        flares.radius[live] + np.hypot(flare_move_x[live], flare_move_y[live]) / 2,
+    )
+    if not pair_flares.size:
+        return
 
+    fl = live[pair_flares]
+    rows = targets[pair_targets]
+    dx = flares.x[fl] - bodies.x[rows]
+    dy = flares.y[fl] - bodies.y[rows]
+    move_x = flare_move_x[fl] - body_move_x[rows]
+    move_y = flare_move_y[fl] - body_move_y[rows]
+    body_toi = sweep_contact(dx, dy, move_x, move_y, flares.radius[fl] + bodies.radius[rows])
+
+    # Moons ride along with their planet; their orbit barely turns in a tick.
+    moon_dx, moon_dy = moon_offsets(bodies, rows)
+    slot_bits = 1 << np.arange(MAX_MOONS)
+    occupied = ((bodies.moon_slots[rows][:, None] & slot_bits) != 0) & (bodies.kind[rows] != ASTEROID_KIND)[:, None]
+    moon_toi = sweep_contact(
+        dx[:, None] - moon_dx, dy[:, None] - moon_dy, move_x[:, None], move_y[:, None],
+        (flares.radius[fl] + MOON_RADIUS)[:, None],
+    )
+    moon_toi[~occupied] = np.inf
+    # Distance from each moon to the flare at the moment it reached the body.
+    before_contact = np.where(np.isfinite(body_toi), 1 - body_toi, 0.0)
+    contact_x = (dx - move_x * before_contact)[:, None] - moon_dx
+    contact_y = (dy - move_y * before_contact)[:, None] - moon_dy
+    moon_dist_sq = (contact_x * contact_x + contact_y * contact_y).tolist()
+    moon_x = (bodies.x[rows][:, None] + moon_dx).tolist()
+    moon_y = (bodies.y[rows][:, None] + moon_dy).tolist()
+    black = flares.kind[fl] == FLARE_KIND_BLACK
+    pair_toi = np.where(black, body_toi, np.minimum(body_toi, moon_toi.min(axis=1)))
+    order = np.lexsort((pair_toi, fl)).tolist()
+    body_hits = np.isfinite(body_toi).tolist()
+    moon_toi = moon_toi.tolist()
+    fl = fl.tolist()
+    rows = rows.tolist()
+
+    spent = -1
+    for pair in order:
+        flare, row = fl[pair], rows[pair]
+        if flare == spent or not bodies.active[row] or bodies.pulled[row]:
+            continue
+
+        is_planet = bodies.kind[row] != ASTEROID_KIND
+        if flares.kind[flare] == FLARE_KIND_BLACK:
+            if is_planet and body_hits[pair]:
+                bodies.pulled[row] = True
+                bodies.pull_speed[row] = BLACK_HOLE_PULL_SPEED_MIN
+                spent = flare
+        else:
+            slots = [slot for slot in range(MAX_MOONS) if bodies.moon_slots[row] & (1 << slot)] if is_planet else []
+            touched = [slot for slot in slots if moon_toi[pair][slot] != math.inf]
+            moon_hit = min(touched, key=lambda slot: moon_toi[pair][slot]) if touched else None
+            if moon_hit is None and body_hits[pair]:
+                if not is_planet:
+                    events.append("flare_hit")
+                    bodies.active[row] = False
+                    spent = flare
+                elif not slots:
+                    spawn_planet_debris(np_rng, debris, bodies, row, (flares.vx[flare], flares.vy[flare]))
+                    events.append("flare_planet_impact")
+                    bodies.active[row] = False
+                    spent = flare
+                else:
+                    # A direct hit still costs the moon closest to the impact.
+                    moon_hit = min(slots, key=lambda slot: moon_dist_sq[pair][slot])
+
+            if moon_hit is not None:
+                remove_moon_from_body(bodies, row, moon_hit)
+                spawn_moon_debris(np_rng, debris, (moon_x[pair][moon_hit], moon_y[pair][moon_hit]))
+                events.append("flare_planet_impact")
+                spent = flare
 
-def spawn_flare():
+        if spent == flare:
+            flares.active[flare] = False
+
+
+def spawn_flare(rng, flares):
     """Spawn a flare from the sun in a random direction"""
-    angle = random.uniform(0, 2 * math.pi)
+    angle = rng.uniform(0, 2 * math.pi)
     vel = (FLARE_SPEED * math.cos(angle), FLARE_SPEED * math.sin(angle))
-    flare = {
-        "pos": list(SUN_POS),
-        "vel": vel,
-        "radius": FLARE_RADIUS,
-        "color": FLARE_COLOR,
-        "lifetime": 300  # Frames until flare expires
-    }
-    return flare
+    # Frames until flare expires: 300
+    flares.add(SUN_POS[0], SUN_POS[1], vel[0], vel[1], FLARE_RADIUS, FLARE_COLOR, 300)
 
 
-def spawn_black_flare():
+def spawn_black_flare(rng, flares):
     """Spawn an invisible black flare from the black hole stage."""
-    angle = random.uniform(0, 2 * math.pi)
-    speed = random.uniform(BLACK_FLARE_SPEED * 0.85, BLACK_FLARE_SPEED * 1.15)
-    return {
-        "pos": list(SUN_POS),
-        "vel": [math.cos(angle) * speed, math.sin(angle) * speed],
-        "radius": BLACK_FLARE_RADIUS,
-        "color": BLACK,
-        "lifetime": 260,
-        "kind": "black",
-    }
-
-
-def spawn_black_hole_ghosts():
-    ghosts = []
+    angle = rng.uniform(0, 2 * math.pi)
+    speed = rng.uniform(BLACK_FLARE_SPEED * 0.85, BLACK_FLARE_SPEED * 1.15)
+    flares.add(
+        SUN_POS[0], SUN_POS[1],
+        math.cos(angle) * speed, math.sin(angle) * speed,
+        BLACK_FLARE_RADIUS, BLACK, 260, kind=FLARE_KIND_BLACK,
+    )
+
+
+def spawn_black_hole_ghosts(rng, ghosts, sun_radius):
+    ghosts.clear()
     for index in range(BLACK_HOLE_GHOST_COUNT):
         angle = (2 * math.pi * index) / BLACK_HOLE_GHOST_COUNT
-        distance = SUN_RADIUS + 140 + index * 40
-        ghosts.append({
-            "pos": [
-                SUN_POS[0] + math.cos(angle) * distance,
-                SUN_POS[1] + math.sin(angle) * distance,
-            ],
-            "vel": [0.0, 0.0],
-            "speed": random.uniform(BLACK_HOLE_GHOST_SPEED_MIN, BLACK_HOLE_GHOST_SPEED_MAX),
-            "phase": random.uniform(0, 2 * math.pi),
-            "trail": [],
-        })
-    return ghosts
-
-
-def spawn_massive_collapse_wave():
+        distance = sun_radius + 140 + index * 40
+        ghosts.add(
+            SUN_POS[0] + math.cos(angle) * distance,
+            SUN_POS[1] + math.sin(angle) * distance,
+            rng.uniform(BLACK_HOLE_GHOST_SPEED_MIN, BLACK_HOLE_GHOST_SPEED_MAX),
+            rng.uniform(0, 2 * math.pi),
+        )
+
+
+def spawn_massive_collapse_wave(rng, flares, sun_radius):
     """Spawn a large radial shock of flares during sun collapse."""
     wave = []
     for i in range(SUN_COLLAPSE_FLARE_COUNT):
-        angle = (2 * math.pi * i) / SUN_COLLAPSE_FLARE_COUNT + random.uniform(-0.03, 0.03)
-        speed = random.uniform(SUN_COLLAPSE_FLARE_SPEED_MIN, SUN_COLLAPSE_FLARE_SPEED_MAX)
-        wave.append({
-            "pos": [SUN_POS[0] + math.cos(angle) * max(3, SUN_RADIUS // 3), SUN_POS[1] + math.sin(angle) * max(3, SUN_RADIUS // 3)],
-            "vel": [math.cos(angle) * speed, math.sin(angle) * speed],
-            "radius": random.randint(4, 8),
-            "color": (200, 235, 255),
-            "lifetime": random.randint(180, 320),
-        })
-    return wave
-
-
-def create_beep_sound(frequency, duration_ms, sample_rate=22050):
-    """Create a simple beep sound with given frequency and duration"""
+        angle = (2 * math.pi * i) / SUN_COLLAPSE_FLARE_COUNT + rng.uniform(-0.03, 0.03)
+        speed = rng.uniform(SUN_COLLAPSE_FLARE_SPEED_MIN, SUN_COLLAPSE_FLARE_SPEED_MAX)
+        wave.append((angle, speed, rng.randint(4, 8), rng.randint(180, 320)))
+    angles, speeds, radii, lifetimes = (np.array(column) for column in zip(*wave))
+    start = max(3, sun_radius // 3)
+    flares.add(
+        SUN_POS[0] + np.cos(angles) * start, SUN_POS[1] + np.sin(angles) * start,
+        np.cos(angles) * speeds, np.sin(angles) * speeds,
+        radii, (200, 235, 255), lifetimes,
+    )
+
+
+def synth_beep(frequency, duration_ms, sample_rate=22050):
+    """Synthesize a simple beep with given frequency and duration"""
     frames = int(duration_ms * sample_rate / 1000)
     arr = np.sin(2.0 * np.pi * np.arange(frames) * frequency / sample_rate)
     arr = (arr * 32767).astype(np.int16)
-    arr = np.repeat(arr.reshape(frames, 1), 2, axis=1)
-    sound = pygame.sndarray.make_sound(arr)
-    return sound
+    return np.repeat(arr.reshape(frames, 1), 2, axis=1)
 
 
-def create_sharp_explosion_sound(duration_ms=140, sample_rate=22050):
-    """Create a short, bright burst for planet impacts on the sun."""
+def synth_sharp_explosion(duration_ms=140, sample_rate=22050):
+    """Synthesize a short, bright burst for planet impacts on the sun."""
     frames = int(duration_ms * sample_rate / 1000)
     t = np.arange(frames, dtype=np.float32) / sample_rate
     # Sharp attack with a quick decay and noisy edge so it feels explosive.
@@ -382,12 +1315,11 @@ def create_sharp_explosion_sound(duration_ms=140, sample_rate=22050):
     wave = (0.72 * tone + 0.28 * noise) * envelope
     wave = np.clip(wave, -1.0, 1.0)
     arr = (wave * 32767).astype(np.int16)
-    arr = np.repeat(arr.reshape(frames, 1), 2, axis=1)
-    return pygame.sndarray.make_sound(arr)
+    return np.repeat(arr.reshape(frames, 1), 2, axis=1)
 
 
-def create_flare_planet_impact_sound(duration_ms=130, sample_rate=22050):
-    """Create a crisp crackle burst for flare-to-planet impacts."""
+def synth_flare_planet_impact(duration_ms=130, sample_rate=22050):
+    """Synthesize a crisp crackle burst for flare-to-planet impacts."""
     frames = int(duration_ms * sample_rate / 1000)
     t = np.arange(frames, dtype=np.float32) / sample_rate
     envelope = np.exp(-18.0 * t)
@@ -396,12 +1328,11 @@ def create_flare_planet_impact_sound(duration_ms=130, sample_rate=22050):
     wave = (0.6 * tone + 0.4 * noise) * envelope
     wave = np.clip(wave, -1.0, 1.0)
     arr = (wave * 32767).astype(np.int16)
-    arr = np.repeat(arr.reshape(frames, 1), 2, axis=1)
-    return pygame.sndarray.make_sound(arr)
+    return np.repeat(arr.reshape(frames, 1), 2, axis=1)
 
 
-def create_black_hole_ambience_sound(duration_ms=950, sample_rate=22050):
-    """Create an eerie drifting tone for the black hole stage."""
+def synth_black_hole_ambience(duration_ms=950, sample_rate=22050):
+    """Synthesize an eerie drifting tone for the black hole stage."""
     frames = int(duration_ms * sample_rate / 1000)
     t = np.arange(frames, dtype=np.float32) / sample_rate
     envelope = np.minimum(1.0, t * 7.0) * np.exp(-1.6 * t)
@@ -411,12 +1342,11 @@ def create_black_hole_ambience_sound(duration_ms=950, sample_rate=22050):
     wave = (0.58 * low + 0.22 * high + 0.20 * noise) * envelope
     wave = np.clip(wave, -1.0, 1.0)
     arr = (wave * 32767).astype(np.int16)
-    arr = np.repeat(arr.reshape(frames, 1), 2, axis=1)
-    return pygame.sndarray.make_sound(arr)
+    return np.repeat(arr.reshape(frames, 1), 2, axis=1)
 
 
-def create_ghost_capture_sound(duration_ms=220, sample_rate=22050):
-    """Create a sharp ghostly shriek for captures."""
+def synth_ghost_capture(duration_ms=220, sample_rate=22050):
+    """Synthesize a sharp ghostly shriek for captures."""
     frames = int(duration_ms * sample_rate / 1000)
     t = np.arange(frames, dtype=np.float32) / sample_rate
     envelope = np.exp(-9.0 * t)
@@ -426,136 +1356,207 @@ def create_ghost_capture_sound(duration_ms=220, sample_rate=22050):
     wave = (0.56 * sweep + 0.22 * undertone + 0.22 * noise) * envelope
     wave = np.clip(wave, -1.0, 1.0)
     arr = (wave * 32767).astype(np.int16)
-    arr = np.repeat(arr.reshape(frames, 1), 2, axis=1)
-    return pygame.sndarray.make_sound(arr)
+    return np.repeat(arr.reshape(frames, 1), 2, axis=1)
 
 
-def spawn_sun_impact_splash(impact_pos, normal_vec):
+def spawn_sun_impact_splash(np_rng, splashes, impact_pos, normal_vec):
     """Spawn violent plasma jets and heavier debris from a sun impact."""
-    splashes = []
     base_angle = math.atan2(normal_vec[1], normal_vec[0])
 
-    plasma_count = random.randint(IMPACT_SPLASH_MIN, IMPACT_SPLASH_MAX)
-    for _ in range(plasma_count):
-        spread = random.uniform(-1.35, 1.35)
-        angle = base_angle + spread
-        speed = random.uniform(IMPACT_SPLASH_SPEED_MIN, IMPACT_SPLASH_SPEED_MAX)
-        life = random.randint(IMPACT_SPLASH_LIFETIME_MIN, IMPACT_SPLASH_LIFETIME_MAX)
-        splashes.append({
-            "pos": [impact_pos[0], impact_pos[1]],
-            "vel": [math.cos(angle) * speed, math.sin(angle) * speed],
-            "radius": random.randint(2, 6),
-            "lifetime": life,
-            "max_life": life,
-            "drag": random.uniform(0.92, 0.97),
-            "kind": "plasma",
-            "base_color": (255, random.randint(120, 220), random.randint(40, 115)),
-        })
-
-    debris_count = random.randint(IMPACT_DEBRIS_MIN, IMPACT_DEBRIS_MAX)
-    for _ in range(debris_count):
-        spread = random.uniform(-1.8, 1.8)
-        angle = base_angle + spread
-        speed = random.uniform(IMPACT_DEBRIS_SPEED_MIN, IMPACT_DEBRIS_SPEED_MAX)
-        life = random.randint(IMPACT_DEBRIS_LIFETIME_MIN, IMPACT_DEBRIS_LIFETIME_MAX)
-        splashes.append({
-            "pos": [impact_pos[0], impact_pos[1]],
-            "vel": [math.cos(angle) * speed, math.sin(angle) * speed],
-            "radius": random.randint(1, 4),
-            "lifetime": life,
-            "max_life": life,
-            "drag": random.uniform(0.90, 0.95),
-            "kind": "debris",
-            "base_color": (255, random.randint(70, 140), random.randint(15, 45)),
-        })
-
-    return splashes
-
-
-def spawn_planet_debris(body, incoming_velocity):
+    count = int(np_rng.integers(IMPACT_SPLASH_MIN, IMPACT_SPLASH_MAX + 1))
+    splashes.spawn(
+        impact_pos[0], impact_pos[1],
+        base_angle + np_rng.uniform(-1.35, 1.35, count),
+        np_rng.uniform(IMPACT_SPLASH_SPEED_MIN, IMPACT_SPLASH_SPEED_MAX, count),
+        radius=np_rng.integers(2, 7, count),
+        lifetime=np_rng.integers(IMPACT_SPLASH_LIFETIME_MIN, IMPACT_SPLASH_LIFETIME_MAX + 1, count),
+        drag=np_rng.uniform(0.92, 0.97, count),
+        color=np.column_stack((
+            np.full(count, 255), np_rng.integers(120, 221, count), np_rng.integers(40, 116, count),
+        )),
+        kind=PARTICLE_KIND_PLASMA,
+    )
+
+    count = int(np_rng.integers(IMPACT_DEBRIS_MIN, IMPACT_DEBRIS_MAX + 1))
+    splashes.spawn(
+        impact_pos[0], impact_pos[1],
+        base_angle + np_rng.uniform(-1.8, 1.8, count),
+        np_rng.uniform(IMPACT_DEBRIS_SPEED_MIN, IMPACT_DEBRIS_SPEED_MAX, count),
+        radius=np_rng.integers(1, 5, count),
+        lifetime=np_rng.integers(IMPACT_DEBRIS_LIFETIME_MIN, IMPACT_DEBRIS_LIFETIME_MAX + 1, count),
+        drag=np_rng.uniform(0.90, 0.95, count),
+        color=np.column_stack((
+            np.full(count, 255), np_rng.integers(70, 141, count), np_rng.integers(15, 46, count),
+        )),
+        kind=PARTICLE_KIND_EMBER,
+    )
+
+
+def spawn_planet_debris(np_rng, debris, bodies, index, incoming_velocity):
     """Break a planet into debris chunks when a solar flare hits it."""
-    debris = []
-    base_angle = math.atan2(incoming_velocity[1], incoming_velocity[0]) if incoming_velocity else random.uniform(0, 2 * math.pi)
-    chunk_count = random.randint(PLANET_DEBRIS_COUNT_MIN, PLANET_DEBRIS_COUNT_MAX)
-    base_color = body.get("color", (200, 200, 200))
-
-    for _ in range(chunk_count):
-        angle = base_angle + random.uniform(-2.2, 2.2)
-        speed = random.uniform(PLANET_DEBRIS_SPEED_MIN, PLANET_DEBRIS_SPEED_MAX)
-        life = random.randint(PLANET_DEBRIS_LIFETIME_MIN, PLANET_DEBRIS_LIFETIME_MAX)
-        debris.append({
-            "pos": [body["pos"][0], body["pos"][1]],
-            "vel": [math.cos(angle) * speed, math.sin(angle) * speed],
-            "radius": random.randint(1, max(2, body["radius"] // 3)),
-            "lifetime": life,
-            "max_life": life,
-            "drag": random.uniform(0.91, 0.96),
-            "color": (
-                min(255, int(base_color[0] * random.uniform(0.8, 1.2))),
-                min(255, int(base_color[1] * random.uniform(0.8, 1.15))),
-                min(255, int(base_color[2] * random.uniform(0.8, 1.25))),
-            ),
-        })
-
-    return debris
-
-
-def spawn_moon_debris(explosion_pos):
-    debris = []
-    chunk_count = random.randint(MOON_DEBRIS_COUNT_MIN, MOON_DEBRIS_COUNT_MAX)
-    for _ in range(chunk_count):
-        angle = random.uniform(0, 2 * math.pi)
-        speed = random.uniform(MOON_DEBRIS_SPEED_MIN, MOON_DEBRIS_SPEED_MAX)
-        life = random.randint(MOON_DEBRIS_LIFETIME_MIN, MOON_DEBRIS_LIFETIME_MAX)
-        debris.append({
-            "pos": [explosion_pos[0], explosion_pos[1]],
-            "vel": [math.cos(angle) * speed, math.sin(angle) * speed],
-            "radius": random.randint(1, 3),
-            "lifetime": life,
-            "max_life": life,
-            "drag": random.uniform(0.90, 0.95),
-            "color": (
-                random.randint(200, 255),
-                random.randint(200, 240),
-                random.randint(210, 255),
-            ),
-        })
-    return debris
-
-
-# Create sound effects
-flare_hit_sound = create_beep_sound(800, 100)  # High pitch, short beep for flare
-swallow_sound = create_beep_sound(400, 150)    # Lower pitch, slightly longer for swallow
-sun_impact_explosion_sound = create_sharp_explosion_sound()
-flare_planet_impact_sound = create_flare_planet_impact_sound()
-black_hole_ambience_sound = create_black_hole_ambience_sound()
-ghost_capture_sound = create_ghost_capture_sound()
-
-# Sun impact splashes list
-sun_impact_splashes = []
-sun_impact_boost_timer = 0
-planet_debris_particles = []
-
-# Sun lifecycle state
-sun_age_frames = 0
-sun_collapsed = False
-white_dwarf_age_frames = 0
-black_hole_active = False
-black_hole_ghosts = []
-black_hole_ambience_timer = 0
-collapse_shockwave = None
-camera_shake_timer = 0
-camera_shake_intensity = 0
-
-
-def draw_planet_face(surface, body):
+    base_angle = math.atan2(incoming_velocity[1], incoming_velocity[0]) if incoming_velocity else np_rng.uniform(0, 2 * math.pi)
+    count = int(np_rng.integers(PLANET_DEBRIS_COUNT_MIN, PLANET_DEBRIS_COUNT_MAX + 1))
+    radius = int(bodies.radius[index])
+    tint = np_rng.uniform((0.8, 0.8, 0.8), (1.2, 1.15, 1.25), (count, 3))
+    debris.spawn(
+        bodies.x[index], bodies.y[index],
+        base_angle + np_rng.uniform(-2.2, 2.2, count),
+        np_rng.uniform(PLANET_DEBRIS_SPEED_MIN, PLANET_DEBRIS_SPEED_MAX, count),
+        radius=np_rng.integers(1, max(2, radius // 3) + 1, count),
+        lifetime=np_rng.integers(PLANET_DEBRIS_LIFETIME_MIN, PLANET_DEBRIS_LIFETIME_MAX + 1, count),
+        drag=np_rng.uniform(0.91, 0.96, count),
+        color=np.minimum(255, (bodies.color[index] * tint).astype(np.int64)),
+    )
+
+
+def spawn_moon_debris(np_rng, debris, explosion_pos):
+    count = int(np_rng.integers(MOON_DEBRIS_COUNT_MIN, MOON_DEBRIS_COUNT_MAX + 1))
+    debris.spawn(
+        explosion_pos[0], explosion_pos[1],
+        np_rng.uniform(0, 2 * math.pi, count),
+        np_rng.uniform(MOON_DEBRIS_SPEED_MIN, MOON_DEBRIS_SPEED_MAX, count),
+        radius=np_rng.integers(1, 4, count),
+        lifetime=np_rng.integers(MOON_DEBRIS_LIFETIME_MIN, MOON_DEBRIS_LIFETIME_MAX + 1, count),
+        drag=np_rng.uniform(0.90, 0.95, count),
+        color=np_rng.integers((200, 200, 210), (256, 241, 256), (count, 3)),
+    )
+
+
+# Event name -> (synth function, positional arguments) for every sound effect.
+SOUND_RECIPES = {
+    "flare_hit": (synth_beep, (800, 100)),  # High pitch, short beep for flare
+    "swallow": (synth_beep, (400, 150)),    # Lower pitch, slightly longer for swallow
+    "sun_impact_explosion": (synth_sharp_explosion, ()),
+    "flare_planet_impact": (synth_flare_planet_impact, ()),
+    "black_hole_ambience": (synth_black_hole_ambience, ()),
+    "ghost_capture": (synth_ghost_capture, ()),
+}
+
+
+# Event name -> (priority, max voices). When every channel is busy a sound
+# may cut off a lower-priority one; it never plays more than its voices.
+SOUND_VOICES = {
+    "black_hole_ambience": (4, 1),
+    "sun_impact_explosion": (3, 2),
+    "ghost_capture": (2, 2),
+    "flare_planet_impact": (2, 3),
+    "swallow": (1, 3),
+    "flare_hit": (0, 3),
+}
+
+
+def sound_cache_key(synth, args):
+    """Name a cached buffer after its synth function, arguments and bytecode.
+
+    Editing a synth function changes the key, so stale buffers are never
+    loaded.
+    """
+    code = hashlib.sha1(marshal.dumps(synth.__code__)).hexdigest()[:12]
+    params = "_".join(str(arg) for arg in args)
+    return f"{synth.__name__}-{params}-{code}" if params else f"{synth.__name__}-{code}"
+
+
+class SoundBank:
+    """Sound effects keyed by event name, synthesized or loaded on demand.
+
+    Each buffer is cached on disk as ``.npy`` and memory-mapped on later
+    launches. ``preload`` fills the bank from a background thread, so the
+    first frame never waits for synthesis; a sound played before its turn
+    is built right away. Only arrays are produced off the main thread,
+    ``pygame.mixer.Sound`` objects are created where they are played.
+    """
+
+    def __init__(self, recipes=SOUND_RECIPES, cache_dir=SOUND_CACHE_DIR):
+        self.recipes = recipes
+        self.cache_dir = cache_dir
+        self._buffers = {}
+        self._sounds = {}
+        self._lock = threading.Lock()
+
+    def buffer(self, name):
+        """Return the int16 sample array for ``name``, building it if needed."""
+        with self._lock:
+            samples = self._buffers.get(name)
+            if samples is None:
+                samples = self._buffers[name] = self._load_or_synth(*self.recipes[name])
+            return samples
+
+    def _load_or_synth(self, synth, args):
+        path = os.path.join(self.cache_dir, sound_cache_key(synth, args) + ".npy")
+        try:
+            return np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            pass
+        samples = synth(*args)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            partial = f"{path}.{os.getpid()}.tmp"
+            with open(partial, "wb") as handle:
+                np.save(handle, samples)
+            os.replace(partial, path)
+        except OSError:
+            pass  # a read-only home just means synthesizing again next launch
+        return samples
+
+    def preload(self):
+        """Build every buffer that is still missing on a daemon thread."""
+        thread = threading.Thread(target=lambda: [self.buffer(name) for name in self.recipes], daemon=True)
+        thread.start()
+        return thread
+
+    def __getitem__(self, name):
+        sound = self._sounds.get(name)
+        if sound is None:
+            sound = self._sounds[name] = pygame.sndarray.make_sound(self.buffer(name))
+        return sound
+
+
+class SoundQueue:
+    """Sound events gathered over a rendered frame and played at its end.
+
+    Repeats of an event within the frame coalesce into one play call.
+    ``flush`` plays the highest priorities first, skips sounds already at
+    their voice limit and only steals a channel from a lower priority.
+    """
+
+    def __init__(self, bank, voices=SOUND_VOICES):
+        self.bank = bank
+        self.voices = voices
+        self.pending = set()
+        self.priorities = {}  # Sound object -> priority, for channel stealing
+
+    def extend(self, names):
+        self.pending.update(names)
+
+    def flush(self):
+        """Make this frame's mixer calls and empty the queue."""
+        for name in sorted(self.pending, key=lambda name: -self.voices[name][0]):
+            priority, max_voices = self.voices[name]
+            sound = self.bank[name]
+            self.priorities[sound] = priority
+            if sound.get_num_channels() >= max_voices:
+                continue
+            channel = pygame.mixer.find_channel() or self._steal_channel(priority)
+            if channel is not None:
+                channel.play(sound)
+        self.pending.clear()
+
+    def _steal_channel(self, priority):
+        """Return the busy channel playing the lowest priority below ``priority``."""
+        victim = None
+        for index in range(pygame.mixer.get_num_channels()):
+            channel = pygame.mixer.Channel(index)
+            rank = self.priorities.get(channel.get_sound(), priority)
+            if rank < priority and (victim is None or rank < victim[0]):
+                victim = (rank, channel)
+        return victim[1] if victim is not None else None
+
+
+def draw_planet_face(surface, x, y, r, mood=DEFAULT_PLANET_MOOD):
     """Draw a mood-based face for a planet (neutral, worried, happy, sleepy)."""
-    x, y = int(body["pos"][0]), int(body["pos"][1])
-    r = body["radius"]
     if r < 8:
         return
 
-    mood = body.get("mood", DEFAULT_PLANET_MOOD)
     eye_ox = max(2, r // 3)
     eye_oy = max(2, r // 4)
     eye_r  = max(2, r // 5)
@@ -601,11 +1602,9 @@ def draw_planet_face(surface, body):
         pygame.draw.line(surface, mouth_color, (x - mouth_w // 3, y + r // 3), (x + mouth_w // 3, y + r // 3), mouth_thickness)
 
 
-def draw_earth_realistic(surface, body):
+def draw_earth_realistic(surface, x, y, r):
     """Draw Earth with realistic continents, oceans, islands, and atmosphere."""
-    x, y = int(body["pos"][0]), int(body["pos"][1])
-    r = body["radius"]
-    
+
     if r < 8:
         return
     
@@ -616,8 +1615,8 @@ def draw_earth_realistic(surface, body):
     if r > 12:
         pygame.draw.circle(surface, (30, 95, 200), (x, y), int(r * 0.95), 1)
     
-    # Create a seeded random for consistent continent placement
-    random.seed(42)  # Fixed seed for consistent Earth appearance
+    # Fixed seed for consistent continent placement, kept off the global random
+    rng = random.Random(42)
     
     # Define continent regions as (center_offset_x, center_offset_y, size_factor, color)
     # Major continents
@@ -640,12 +1639,12 @@ def draw_earth_realistic(surface, body):
     
     # Draw major continents with variation
     for cont_x, cont_y, size, color in continents:
-        offset_x = cont_x + random.uniform(-0.08, 0.08)
-        offset_y = cont_y + random.uniform(-0.08, 0.08)
+        offset_x = cont_x + rng.uniform(-0.08, 0.08)
+        offset_y = cont_y + rng.uniform(-0.08, 0.08)
         
         cent_x = int(x + offset_x * r)
         cent_y = int(y + offset_y * r)
-        cent_r = int(size * r * random.uniform(0.88, 1.12))
+        cent_r = int(size * r * rng.uniform(0.88, 1.12))
         
         # Draw continent
         pygame.draw.circle(surface, color, (cent_x, cent_y), cent_r)
@@ -667,12 +1666,12 @@ def draw_earth_realistic(surface, body):
     ]
     
     for island_x, island_y, size, color in island_regions:
-        offset_x = island_x + random.uniform(-0.05, 0.05)
-        offset_y = island_y + random.uniform(-0.05, 0.05)
+        offset_x = island_x + rng.uniform(-0.05, 0.05)
+        offset_y = island_y + rng.uniform(-0.05, 0.05)
         
         isle_x = int(x + offset_x * r)
         isle_y = int(y + offset_y * r)
-        isle_r = int(size * r * random.uniform(0.9, 1.1))
+        isle_r = int(size * r * rng.uniform(0.9, 1.1))
         
         # Only draw if island is within planet bounds
         dist = math.hypot(isle_x - x, isle_y - y)
@@ -696,13 +1695,13 @@ def draw_earth_realistic(surface, body):
             pygame.draw.circle(surface, (210, 215, 225), (cx, cy), int(cr * 0.7))
     
     # Trade wind cloud bands
-    num_bands = random.randint(2, 3)
+    num_bands = rng.randint(2, 3)
     for band in range(num_bands):
-        band_y = int(y + random.uniform(-r * 0.6, r * 0.6))
-        num_clouds_in_band = random.randint(3, 5)
+        band_y = int(y + rng.uniform(-r * 0.6, r * 0.6))
+        num_clouds_in_band = rng.randint(3, 5)
         for _ in range(num_clouds_in_band):
-            cloud_x = int(x + random.uniform(-r * 0.85, r * 0.85))
-            cloud_r = int(r * random.uniform(0.12, 0.28))
+            cloud_x = int(x + rng.uniform(-r * 0.85, r * 0.85))
+            cloud_r = int(r * rng.uniform(0.12, 0.28))
             
             dist_from_center = math.hypot(cloud_x - x, band_y - y)
             if dist_from_center + cloud_r <= r:
@@ -713,77 +1712,142 @@ def draw_earth_realistic(surface, body):
         # Polar storms (small cloud systems at poles)
         for pole_offset in [-1, 1]:
             pole_y = int(y + pole_offset * r * 0.7)
-            num_polar_clouds = random.randint(2, 3)
+            num_polar_clouds = rng.randint(2, 3)
             for _ in range(num_polar_clouds):
-                pc_x = int(x + random.uniform(-r * 0.4, r * 0.4))
-                pc_r = int(r * random.uniform(0.1, 0.18))
+                pc_x = int(x + rng.uniform(-r * 0.4, r * 0.4))
+                pc_r = int(r * rng.uniform(0.1, 0.18))
                 dist = math.hypot(pc_x - x, pole_y - y)
                 if dist + pc_r <= r:
                     draw_cloud(pc_x, pole_y, pc_r, (230, 235, 240))
-    
-    # Restore random seed
-    random.seed()
-
-
-def get_threat_vector(body, active_planets, flares, level):
-    """Return normalized vector away from nearest threat and whether a threat is nearby."""
-    detect_range = (
-        THREAT_DETECTION_BASE
-        + body["radius"] * THREAT_DETECTION_PER_RADIUS
-        + (level - 1) * THREAT_DETECTION_LEVEL_BONUS
-    )
-    nearest_dist = float("inf")
-    away_vec = None
-
-    for other in active_planets:
-        if other is body:
-            continue
-        if other["radius"] <= body["radius"]:
-            continue
-
-        dx = body["pos"][0] - other["pos"][0]
-        dy = body["pos"][1] - other["pos"][1]
-        dist = math.hypot(dx, dy)
-        if 0 < dist < detect_range and dist < nearest_dist:
-            nearest_dist = dist
-            away_vec = (dx / dist, dy / dist)
 
-    for flare in flares:
-        dx = body["pos"][0] - flare["pos"][0]
-        dy = body["pos"][1] - flare["pos"][1]
-        dist = math.hypot(dx, dy)
-        if 0 < dist < detect_range and dist < nearest_dist:
-            nearest_dist = dist
-            away_vec = (dx / dist, dy / dist)
 
-    return away_vec
-
-
-def is_threat_to_smaller_planet(body, active_planets, level):
-    """Return True if this planet is currently menacing any smaller nearby planet."""
+class SpriteCache:
+    """Least-recently-used cache of pre-rendered surfaces, bounded by pixel bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.entries = OrderedDict()
+
+    def get(self, key, render):
+        """Return the sprite for ``key``, calling ``render()`` on a miss."""
+        sprite = self.entries.get(key)
+        if sprite is None:
+            sprite = render()
+            self.entries[key] = sprite
+            self.bytes += sprite.get_pitch() * sprite.get_height()
+            while self.bytes > self.max_bytes and len(self.entries) > 1:
+                _, dropped = self.entries.popitem(last=False)
+                self.bytes -= dropped.get_pitch() * dropped.get_height()
+        else:
+            self.entries.move_to_end(key)
+        return sprite
+
+
+class SpriteAtlas:
+    """Sprites per body kind, rendered once per (kind, radius, variant).
+
+    A planet's look only changes when its radius does, so seeing a kind at a
+    new radius drops every sprite rendered for its old one.
+    """
+
+    def __init__(self):
+        self.kind_radius = {}
+        self.sprites = {}
+
+    def get(self, kind, radius, variant, render):
+        """Return the sprite for this key, calling ``render()`` on a miss."""
+        if self.kind_radius.get(kind) != radius:
+            self.kind_radius[kind] = radius
+            for key in [key for key in self.sprites if key[0] == kind]:
+                del self.sprites[key]
+        key = (kind, variant)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.sprites[key] = render()
+        return sprite
+
+
+def draw_planet_rings(surface, x, y, r, kind):
+    """Draw Saturn's or Uranus's rings around a planet of radius ``r``."""
+    # Saturn rings
+    if kind == SATURN_KIND:
+        for ring_r in range(r + 10, r + 28, 5):
+            pygame.draw.circle(surface, RING_COLOR, (x, y), ring_r, 3)
+
+    # Uranus rings (faint)
+    if kind == URANUS_KIND:
+        for ring_r in range(r + 6, r + 18, 4):
+            pygame.draw.circle(surface, URANUS_RING_COLOR, (x, y), ring_r, 1)
+
+
+def render_centered_sprite(half, draw):
+    """Render ``draw(surface, cx, cy)`` onto a transparent square sprite."""
+    sprite = pygame.Surface((half * 2, half * 2), pygame.SRCALPHA)
+    draw(sprite, half, half)
+    return sprite
+
+
+def render_earth_sprite(r):
+    """Pre-render Earth of radius ``r`` centred on a transparent sprite."""
+    # Continents and the atmosphere reach a little past the planet's edge.
+    return render_centered_sprite(int(r * 1.15) + 6, lambda surface, x, y: draw_earth_realistic(surface, x, y, r))
+
+
+def scan_planet_threats(bodies, planet_rows, flares, level):
+    """Find each planet's nearest threat and whether it is menacing smaller prey.
+
+    Planets and flares go into one grid that every planet queries once
+    within its detection range. A threat is a larger planet or any flare;
+    prey is a smaller planet. Returns the unit vectors away from the nearest
+    threat (NaN where there is none) and a has-prey flag, both aligned with
+    ``planet_rows``. On equal distances planets win over flares and earlier
+    rows over later ones.
+    """
+    count = len(planet_rows)
+    away = np.full((count, 2), np.nan)
+    has_prey = np.zeros(count, dtype=bool)
+    if not count:
+        return away, has_prey
+
+    radius = bodies.radius[planet_rows]
+    px = bodies.x[planet_rows]
+    py = bodies.y[planet_rows]
     detect_range = (
         THREAT_DETECTION_BASE
-        + body["radius"] * THREAT_DETECTION_PER_RADIUS
+        + radius * THREAT_DETECTION_PER_RADIUS
         + (level - 1) * THREAT_DETECTION_LEVEL_BONUS
-    )
-    for other in active_planets:
-        if other is body:
-            continue
-        if body["radius"] <= other["radius"]:
-            continue
-
-        dx = body["pos"][0] - other["pos"][0]
-        dy = body["pos"][1] - other["pos"][1]
-        dist = math.hypot(dx, dy)
-        if dist < detect_range:
-            return True
-    return False
-
-
-def draw_sun_face(surface, is_angry):
+    ).astype(np.float64)
+
+    # Items 0..count-1 are the planets themselves, the rest are flares.
+    item_x = np.concatenate((px, flares.x))
+    item_y = np.concatenate((py, flares.y))
+    grid = SpatialGrid(item_x, item_y, np.zeros(len(item_x)), THREAT_GRID_CELL_SIZE)
+    planet, item = grid.query(px, py, detect_range)
+
+    is_planet = item < count
+    other = np.where(is_planet, item, 0)
+    dx = px[planet] - item_x[item]
+    dy = py[planet] - item_y[item]
+    dist = np.hypot(dx, dy)
+    not_self = item != planet
+    larger = is_planet & (radius[other] > radius[planet])
+    smaller = is_planet & (radius[other] < radius[planet])
+
+    has_prey[planet[smaller & not_self]] = True
+
+    threat = (dist > 0) & (larger | ~is_planet)
+    planet, item, dx, dy, dist = planet[threat], item[threat], dx[threat], dy[threat], dist[threat]
+    order = np.lexsort((item, dist, planet))
+    nearest = order[np.unique(planet[order], return_index=True)[1]]
+    away[planet[nearest], 0] = dx[nearest] / dist[nearest]
+    away[planet[nearest], 1] = dy[nearest] / dist[nearest]
+    return away, has_prey
+
+
+def draw_sun_face(surface, r, is_angry, center=SUN_POS):
     """Draw sleepy or angry expression for the sun based on flare activity."""
-    x, y = SUN_POS
-    r = SUN_RADIUS
+    x, y = center
     eye_ox = r // 3
     eye_oy = r // 4
     eye_r = max(3, r // 10)
@@ -840,539 +1904,732 @@ def draw_wormhole(surface, wh):
         pygame.draw.circle(surface, color, (x, y), pulse_r, 1)
 
 
-# Main game loop
-running = True
-clock = pygame.time.Clock()
-game_over = False
-level_passed = False
-font = pygame.font.Font(None, 36)
-large_font = pygame.font.Font(None, 72)
-
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_SPACE:
-                if level_passed:
-                    # Next level
-                    LEVEL += 1
-                    FLARE_FREQUENCY_MULTIPLIER = 1.0 * (1.5 ** (LEVEL - 1))
-                    level_passed = False
-                    game_over = False
-                    # Reset bodies with new counts
-                    bodies.clear()
-                    bodies.extend([create_body(name, radius, color) for name, radius, color in PLANETS_DATA])
-                    num_asteroids = min(int(NUM_ASTEROIDS * (1.5 ** (LEVEL - 1))), MAX_ASTEROIDS)
-                    for _ in range(num_asteroids):
-                        bodies.append(create_body("Asteroid", ASTEROID_RADIUS, ASTEROID_COLOR, is_asteroid=True))
-                    flares.clear()
-                    sun_impact_splashes.clear()
-                    planet_debris_particles.clear()
-                    sun_impact_boost_timer = 0
-                    sun_age_frames = 0
-                    sun_collapsed = False
-                    white_dwarf_age_frames = 0
-                    black_hole_active = False
-                    black_hole_ghosts.clear()
-                    black_hole_ambience_timer = 0
-                    SUN_RADIUS = SUN_BASE_RADIUS
-                    collapse_shockwave = None
-                    camera_shake_timer = 0
-                    camera_shake_intensity = 0
-                elif game_over:
-                    # Restart from level 1
-                    LEVEL = 1
-                    FLARE_FREQUENCY_MULTIPLIER = 1.0
-                    game_over = False
-                    level_passed = False
-                    # Reset bodies
-                    bodies.clear()
-                    bodies.extend([create_body(name, radius, color) for name, radius, color in PLANETS_DATA])
-                    num_asteroids = min(NUM_ASTEROIDS, MAX_ASTEROIDS)
-                    for _ in range(num_asteroids):
-                        bodies.append(create_body("Asteroid", ASTEROID_RADIUS, ASTEROID_COLOR, is_asteroid=True))
-                    flares.clear()
-                    sun_impact_splashes.clear()
-                    planet_debris_particles.clear()
-                    sun_impact_boost_timer = 0
-                    sun_age_frames = 0
-                    sun_collapsed = False
-                    white_dwarf_age_frames = 0
-                    black_hole_active = False
-                    black_hole_ghosts.clear()
-                    black_hole_ambience_timer = 0
-                    SUN_RADIUS = SUN_BASE_RADIUS
-                    collapse_shockwave = None
-                    camera_shake_timer = 0
-                    camera_shake_intensity = 0
-
-    screen.fill(BLACK)
-
-    keys = pygame.key.get_pressed()
-
-    if sun_impact_boost_timer > 0:
-        sun_impact_boost_timer -= 1
-
-    if camera_shake_timer > 0:
-        camera_shake_timer -= 1
-
-    if collapse_shockwave is not None:
-        collapse_shockwave["radius"] += COLLAPSE_SHOCKWAVE_SPEED
-        collapse_shockwave["life"] -= 1
-        if collapse_shockwave["life"] <= 0:
-            collapse_shockwave = None
-
-    if not level_passed and not game_over:
+def render_ghost_sprite(alpha):
+    """Pre-render a black hole ghost body at the given alpha."""
+    def draw(surface, gx, gy):
+        body_rect = pygame.Rect(gx - BLACK_HOLE_GHOST_RADIUS, gy - BLACK_HOLE_GHOST_RADIUS, BLACK_HOLE_GHOST_RADIUS * 2, BLACK_HOLE_GHOST_RADIUS * 2)
+        pygame.draw.ellipse(surface, (*GHOST_COLOR, alpha), body_rect)
+        skirt_y = gy + BLACK_HOLE_GHOST_RADIUS // 2
+        for offset in (-10, 0, 10):
+            pygame.draw.circle(surface, (*GHOST_COLOR, alpha), (gx + offset, skirt_y), 6)
+        eye_alpha = min(255, alpha + 25)
+        pygame.draw.circle(surface, (*GHOST_EYE_COLOR, eye_alpha), (gx - 5, gy - 2), 2)
+        pygame.draw.circle(surface, (*GHOST_EYE_COLOR, eye_alpha), (gx + 5, gy - 2), 2)
+    return render_centered_sprite(BLACK_HOLE_GHOST_RADIUS, draw)
+
+
+def render_ghost_trail_sprite(radius, alpha):
+    """Pre-render one translucent ghost trail puff."""
+    return render_centered_sprite(
+        radius + 1, lambda surface, x, y: pygame.draw.circle(surface, (*GHOST_COLOR, alpha), (x, y), radius))
+
+
+def wormhole_frame_index(angle):
+    """Nearest pre-rendered animation frame for a portal angle."""
+    return round(angle * WORMHOLE_ANIMATION_FRAMES / (2 * math.pi)) % WORMHOLE_ANIMATION_FRAMES
+
+
+def render_wormhole_frame(color, index):
+    """Pre-render one portal animation frame as a transparent sprite."""
+    angle = index * 2 * math.pi / WORMHOLE_ANIMATION_FRAMES
+    return render_centered_sprite(
+        WORMHOLE_RADIUS + 5,
+        lambda surface, x, y: draw_wormhole(surface, {"pos": (x, y), "color": color, "angle": angle}),
+    )
+
+
+class Simulation:
+    """World state and per-frame update, with no display or mixer access.
+
+    ``step(inputs)`` advances one frame from a bitmask of INPUT_* flags.
+    Sounds the frame wants played are left as event names in
+    ``sound_events``; drawing is done separately by ``Renderer``. All
+    randomness comes from ``rng``, so a seed reproduces a run.
+    """
+
+    def __init__(self, seed=None, level=1):
+        self.rng = random.Random(seed)
+        # Vectorized particle bursts draw from NumPy, seeded from rng.
+        self.np_rng = np.random.default_rng(self.rng.getrandbits(64))
+        self.bodies = BodyStore()
+        self.flares = FlareStore()
+        self.sun_impact_splashes = ParticlePool()
+        self.planet_debris_particles = ParticlePool()
+        self.black_hole_ghosts = GhostStore()
+        self.sound_events = []
+        self.frame = 0
+        self.profiler = FrameProfiler()
+        # Two connected wormhole portals
+        self.wormholes = [
+            {"pos": [200, 200],             "color": (160, 0, 255),  "angle": 0.0},
+            {"pos": [WIDTH - 200, HEIGHT - 200], "color": (0, 220, 255), "angle": 0.0},
+        ]
+        self.start_level(level)
+
+    def position_stores(self):
+        return (
+            self.bodies, self.flares, self.black_hole_ghosts,
+            self.sun_impact_splashes, self.planet_debris_particles,
+        )
+
+    def start_level(self, level):
+        """Reset the sun and respawn every body for ``level``."""
+        self.level = level
+        self.flare_frequency_multiplier = 1.0 * (1.5 ** (level - 1))
+        self.level_passed = False
+        self.game_over = False
+        self.sun_radius = SUN_BASE_RADIUS
+        self.sun_impact_boost_timer = 0
+        self.sun_age_frames = 0
+        self.sun_collapsed = False
+        self.white_dwarf_age_frames = 0
+        self.black_hole_active = False
+        self.black_hole_ghosts.clear()
+        self.black_hole_ambience_timer = 0
+        self.collapse_shockwave = None
+        self.camera_shake_timer = 0
+        self.camera_shake_intensity = 0
+        spawn_level_bodies(self.bodies, self.np_rng, level)
+        self.flares.clear()
+        self.sun_impact_splashes.clear()
+        self.planet_debris_particles.clear()
+
+    @property
+    def playing(self):
+        return not self.level_passed and not self.game_over
+
+    def snapshot(self):
+        """Pack the whole world into one contiguous ``bytes`` object."""
+        shockwave = self.collapse_shockwave or {"radius": 0, "life": 0, "max_life": 0}
+        chunks = [
+            SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION),
+            SNAPSHOT_SCALARS.pack(
+                self.frame, self.level, self.flare_frequency_multiplier,
+                self.level_passed, self.game_over,
+                self.sun_radius, self.sun_impact_boost_timer, self.sun_age_frames,
+                self.sun_collapsed, self.white_dwarf_age_frames,
+                self.black_hole_active, self.black_hole_ambience_timer,
+                self.collapse_shockwave is not None,
+                shockwave["radius"], shockwave["life"], shockwave["max_life"], shockwave.get("dark", False),
+                self.camera_shake_timer, self.camera_shake_intensity,
+                self.wormholes[0]["angle"], self.wormholes[1]["angle"],
+            ),
+        ]
+        _, words, gauss_next = self.rng.getstate()
+        chunks.append(np.array(words, dtype=np.uint32).tobytes())
+        chunks.append(SNAPSHOT_GAUSS.pack(gauss_next is not None, gauss_next or 0.0))
+        pcg = self.np_rng.bit_generator.state
+        chunks.append(SNAPSHOT_PCG64.pack(
+            pcg["state"]["state"].to_bytes(16, "little"),
+            pcg["state"]["inc"].to_bytes(16, "little"),
+            pcg["has_uint32"], pcg["uinteger"],
+        ))
+        for store in self.position_stores():
+            store.pack(chunks)
+        return b"".join(chunks)
+
+    def restore(self, data):
+        """Replace the whole world with a ``snapshot``; ``data`` may be any buffer."""
+        magic, version = SNAPSHOT_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"not a version {SNAPSHOT_VERSION} world snapshot")
+        offset = SNAPSHOT_HEADER.size
+        (
+            self.frame, self.level, self.flare_frequency_multiplier,
+            self.level_passed, self.game_over,
+            self.sun_radius, self.sun_impact_boost_timer, self.sun_age_frames,
+            self.sun_collapsed, self.white_dwarf_age_frames,
+            self.black_hole_active, self.black_hole_ambience_timer,
+            has_shockwave, shock_radius, shock_life, shock_max_life, shock_dark,
+            self.camera_shake_timer, self.camera_shake_intensity,
+            self.wormholes[0]["angle"], self.wormholes[1]["angle"],
+        ) = SNAPSHOT_SCALARS.unpack_from(data, offset)
+        offset += SNAPSHOT_SCALARS.size
+        self.collapse_shockwave = None
+        if has_shockwave:
+            self.collapse_shockwave = {"radius": shock_radius, "life": shock_life, "max_life": shock_max_life}
+            if shock_dark:
+                self.collapse_shockwave["dark"] = True
+
+        words = np.frombuffer(data, dtype=np.uint32, count=SNAPSHOT_MT_WORDS, offset=offset)
+        offset += words.nbytes
+        has_gauss, gauss_next = SNAPSHOT_GAUSS.unpack_from(data, offset)
+        offset += SNAPSHOT_GAUSS.size
+        self.rng.setstate((3, tuple(words.tolist()), gauss_next if has_gauss else None))
+        state, inc, has_uint32, uinteger = SNAPSHOT_PCG64.unpack_from(data, offset)
+        offset += SNAPSHOT_PCG64.size
+        self.np_rng.bit_generator.state = {
+            "bit_generator": "PCG64",
+            "state": {"state": int.from_bytes(state, "little"), "inc": int.from_bytes(inc, "little")},
+            "has_uint32": has_uint32,
+            "uinteger": uinteger,
+        }
+        # One byte view over the whole snapshot; every store copies out of it.
+        data = np.frombuffer(data, dtype=np.uint8)
+        for store in self.position_stores():
+            offset = store.unpack(data, offset)
+        self.sound_events.clear()
+
+    def state_digest(self):
+        """Hash every store, the sun state and both generators' states."""
+        digest = hashlib.sha1()
+        for store in self.position_stores():
+            for name, _, _ in store.FIELDS:
+                digest.update(getattr(store, name).tobytes())
+        digest.update(repr((
+            self.frame, self.level, self.sun_radius, self.sun_age_frames,
+            self.white_dwarf_age_frames, self.black_hole_active,
+            self.rng.getstate(), self.np_rng.bit_generator.state,
+        )).encode())
+        return digest.digest()
+
+    def step(self, inputs=0, dt=1):
+        """Advance the world by ``dt`` ticks in one step.
+
+        Every speed, timer and spawn chance is scaled to cover ``dt`` ticks,
+        and collisions are swept along the longer moves, so fast-forward and
+        headless runs can take 2-8 ticks at a time. ``inputs`` hold for the
+        whole step.
+        """
+        lap = self.profiler.lap
+        self.profiler.mark()
+        self.sound_events.clear()
+        for store in self.position_stores():
+            store.remember_positions()
+        if inputs & INPUT_ADVANCE:
+            if self.level_passed:
+                self.start_level(self.level + 1)
+            elif self.game_over:
+                self.start_level(1)
+
+        self.update_timers(dt)
+        if self.playing:
+            self.update_sun_lifecycle(dt)
+            lap("sun")
+            self.spawn_flares(dt)
+            lap("flare_spawn")
+        else:
+            lap("sun")
+        self.update_planet_ai(dt)
+        lap("threat_ai")
+        if self.black_hole_active:
+            self.update_ghosts(dt)
+            lap("ghosts")
+        self.update_pulled_bodies(dt)
+        self.move_bodies(inputs, dt)
+        lap("movement")
+        self.update_wormholes(dt)
+        lap("wormholes")
+        self.update_flares(dt)
+        lap("flare_update")
+        self.update_particles(dt)
+        lap("particles")
+
+        # Flare collisions with bodies
+        resolve_flare_hits(self.bodies, self.flares, self.np_rng, self.planet_debris_particles, self.sound_events, dt)
+        self.flares.compact()
+        lap("flare_collisions")
+
+        # Planet/Asteroid collisions (only among active survivors)
+        resolve_swallows(self.bodies, self.sound_events, dt)
+
+        self.check_win()
+        self.bodies.compact()
+        lap("body_collisions")
+        self.frame += dt
+
+    def update_timers(self, dt=1):
+        self.sun_impact_boost_timer = max(0, self.sun_impact_boost_timer - dt)
+        self.camera_shake_timer = max(0, self.camera_shake_timer - dt)
+
+        shockwave = self.collapse_shockwave
+        if shockwave is not None:
+            shockwave["radius"] += COLLAPSE_SHOCKWAVE_SPEED * dt
+            shockwave["life"] -= dt
+            if shockwave["life"] <= 0:
+                self.collapse_shockwave = None
+
+    def update_sun_lifecycle(self, dt=1):
+        """Age the sun: main sequence, blue giant, white dwarf, black hole."""
         blue_giant_start = int(SUN_AGE_MAX_FRAMES * SUN_BLUE_GIANT_START_RATIO)
-        if black_hole_active:
-            SUN_RADIUS = max(10, int(SUN_BASE_RADIUS * SUN_BLACK_HOLE_RADIUS_MULT))
-        elif sun_collapsed:
-            white_dwarf_age_frames += 1
-            SUN_RADIUS = max(16, int(SUN_BASE_RADIUS * SUN_WHITE_DWARF_RADIUS_MULT))
-            if white_dwarf_age_frames >= WHITE_DWARF_MAX_FRAMES:
-                black_hole_active = True
-                black_hole_ghosts = spawn_black_hole_ghosts()
-                black_hole_ambience_timer = BLACK_HOLE_AMBIENCE_INTERVAL
-                SUN_RADIUS = max(10, int(SUN_BASE_RADIUS * SUN_BLACK_HOLE_RADIUS_MULT))
-                collapse_shockwave = {
-                    "radius": SUN_RADIUS + 6,
+        if self.black_hole_active:
+            self.sun_radius = max(10, int(SUN_BASE_RADIUS * SUN_BLACK_HOLE_RADIUS_MULT))
+        elif self.sun_collapsed:
+            self.white_dwarf_age_frames += dt
+            self.sun_radius = max(16, int(SUN_BASE_RADIUS * SUN_WHITE_DWARF_RADIUS_MULT))
+            if self.white_dwarf_age_frames >= WHITE_DWARF_MAX_FRAMES:
+                self.black_hole_active = True
+                spawn_black_hole_ghosts(self.rng, self.black_hole_ghosts, self.sun_radius)
+                self.black_hole_ambience_timer = BLACK_HOLE_AMBIENCE_INTERVAL
+                self.sun_radius = max(10, int(SUN_BASE_RADIUS * SUN_BLACK_HOLE_RADIUS_MULT))
+                self.collapse_shockwave = {
+                    "radius": self.sun_radius + 6,
                     "life": COLLAPSE_SHOCKWAVE_DURATION,
                     "max_life": COLLAPSE_SHOCKWAVE_DURATION,
                     "dark": True,
                 }
-                camera_shake_timer = COLLAPSE_SHAKE_FRAMES
-                camera_shake_intensity = COLLAPSE_SHAKE_INTENSITY
-                black_hole_ambience_sound.play()
+                self.camera_shake_timer = COLLAPSE_SHAKE_FRAMES
+                self.camera_shake_intensity = COLLAPSE_SHAKE_INTENSITY
+                self.sound_events.append("black_hole_ambience")
         else:
-            sun_age_frames += 1
-            if sun_age_frames >= SUN_AGE_MAX_FRAMES:
-                sun_collapsed = True
-                white_dwarf_age_frames = 0
-                SUN_RADIUS = max(16, int(SUN_BASE_RADIUS * SUN_WHITE_DWARF_RADIUS_MULT))
-                flares.extend(spawn_massive_collapse_wave())
-                sun_impact_explosion_sound.play()
-                collapse_shockwave = {
-                    "radius": SUN_RADIUS + 8,
+            self.sun_age_frames += dt
+            if self.sun_age_frames >= SUN_AGE_MAX_FRAMES:
+                self.sun_collapsed = True
+                self.white_dwarf_age_frames = 0
+                self.sun_radius = max(16, int(SUN_BASE_RADIUS * SUN_WHITE_DWARF_RADIUS_MULT))
+                spawn_massive_collapse_wave(self.rng, self.flares, self.sun_radius)
+                self.sound_events.append("sun_impact_explosion")
+                self.collapse_shockwave = {
+                    "radius": self.sun_radius + 8,
                     "life": COLLAPSE_SHOCKWAVE_DURATION,
                     "max_life": COLLAPSE_SHOCKWAVE_DURATION,
                 }
-                camera_shake_timer = COLLAPSE_SHAKE_FRAMES
-                camera_shake_intensity = COLLAPSE_SHAKE_INTENSITY
-            elif sun_age_frames >= blue_giant_start:
+                self.camera_shake_timer = COLLAPSE_SHAKE_FRAMES
+                self.camera_shake_intensity = COLLAPSE_SHAKE_INTENSITY
+            elif self.sun_age_frames >= blue_giant_start:
                 # Grow from baseline to giant size before collapse.
-                giant_progress = (sun_age_frames - blue_giant_start) / max(1, SUN_AGE_MAX_FRAMES - blue_giant_start)
+                giant_progress = (self.sun_age_frames - blue_giant_start) / max(1, SUN_AGE_MAX_FRAMES - blue_giant_start)
                 giant_progress = max(0.0, min(1.0, giant_progress))
-                SUN_RADIUS = int(SUN_BASE_RADIUS * (1.0 + (SUN_BLUE_GIANT_RADIUS_MULT - 1.0) * giant_progress))
+                self.sun_radius = int(SUN_BASE_RADIUS * (1.0 + (SUN_BLUE_GIANT_RADIUS_MULT - 1.0) * giant_progress))
             else:
-                SUN_RADIUS = SUN_BASE_RADIUS
-
-    # Spawn flares randomly with level-based frequency
-    if not level_passed and not game_over:
-        if black_hole_active:
-            if random.random() < BLACK_FLARE_SPAWN_CHANCE:
-                flares.append(spawn_black_flare())
-            if black_hole_ambience_timer <= 0:
-                black_hole_ambience_sound.play()
-                black_hole_ambience_timer = BLACK_HOLE_AMBIENCE_INTERVAL
+                self.sun_radius = SUN_BASE_RADIUS
+
+    def spawn_flares(self, dt=1):
+        """Spawn flares randomly with level-based frequency, one roll per tick."""
+        if self.black_hole_active:
+            for _ in range(dt):
+                if self.rng.random() < BLACK_FLARE_SPAWN_CHANCE:
+                    spawn_black_flare(self.rng, self.flares)
+            if self.black_hole_ambience_timer <= 0:
+                self.sound_events.append("black_hole_ambience")
+                self.black_hole_ambience_timer = BLACK_HOLE_AMBIENCE_INTERVAL
             else:
-                black_hole_ambience_timer -= 1
+                self.black_hole_ambience_timer -= dt
         else:
-            spawn_chance = FLARE_SPAWN_CHANCE * FLARE_FREQUENCY_MULTIPLIER
-            if sun_impact_boost_timer > 0:
+            spawn_chance = FLARE_SPAWN_CHANCE * self.flare_frequency_multiplier
+            if self.sun_impact_boost_timer > 0:
                 spawn_chance *= SUN_IMPACT_FLARE_MULTIPLIER
-            if random.random() < spawn_chance:
-                flares.append(spawn_flare())
-
-    # Planet face state + threat-response AI
-    active_planets = [b for b in bodies if b["active"] and b["name"] != "Asteroid"]
-    for body in active_planets:
-        body["moon_orbit_angle"] = (body.get("moon_orbit_angle", 0.0) + body.get("moon_orbit_speed", MOON_ORBIT_SPEED_MIN)) % (2 * math.pi)
-        mood = DEFAULT_PLANET_MOOD
-        away_vec = get_threat_vector(body, active_planets, flares, LEVEL)
-
-        if away_vec is not None:
-            mood = "worried"
-            if body["name"] != "Earth":
-                escape_chance = min(
-                    ESCAPE_CHANCE_MAX,
-                    ESCAPE_CHANCE_BASE + (LEVEL - 1) * ESCAPE_CHANCE_PER_LEVEL,
-                )
-                if random.random() < escape_chance:
-                    escape_accel = min(
-                        ESCAPE_ACCEL_MAX,
-                        ESCAPE_ACCEL_BASE + (LEVEL - 1) * ESCAPE_ACCEL_PER_LEVEL,
-                    )
-                    body["vel"][0] += away_vec[0] * escape_accel
-                    body["vel"][1] += away_vec[1] * escape_accel
-                    speed = math.hypot(body["vel"][0], body["vel"][1])
-                    if speed > PLANET_MAX_SPEED:
-                        body["vel"][0] = (body["vel"][0] / speed) * PLANET_MAX_SPEED
-                        body["vel"][1] = (body["vel"][1] / speed) * PLANET_MAX_SPEED
-        elif is_threat_to_smaller_planet(body, active_planets, LEVEL):
-            mood = "happy"
-
-        body["mood"] = mood
-
-    # Update black hole ghosts and let them hunt planets.
-    if black_hole_active:
-        huntable_planets = [b for b in bodies if b["active"] and b["name"] != "Asteroid" and not b.get("black_hole_pull", False)]
-        for ghost in black_hole_ghosts:
-            ghost["phase"] = (ghost["phase"] + 0.08) % (2 * math.pi)
-            if huntable_planets:
-                target = min(
-                    huntable_planets,
-                    key=lambda body: (ghost["pos"][0] - body["pos"][0]) ** 2 + (ghost["pos"][1] - body["pos"][1]) ** 2,
-                )
-                dx = target["pos"][0] - ghost["pos"][0]
-                dy = target["pos"][1] - ghost["pos"][1]
-                dist = math.hypot(dx, dy)
-                if dist > 0:
-                    wobble_x = math.cos(ghost["phase"]) * 0.65
-                    wobble_y = math.sin(ghost["phase"] * 1.3) * 0.65
-                    ghost["vel"][0] = (dx / dist) * ghost["speed"] + wobble_x
-                    ghost["vel"][1] = (dy / dist) * ghost["speed"] + wobble_y
-            else:
-                orbit_angle = math.atan2(ghost["pos"][1] - SUN_POS[1], ghost["pos"][0] - SUN_POS[0]) + 0.04
-                orbit_radius = max(SUN_RADIUS + 110, math.hypot(ghost["pos"][0] - SUN_POS[0], ghost["pos"][1] - SUN_POS[1]))
-                ghost["pos"][0] = SUN_POS[0] + math.cos(orbit_angle) * orbit_radius
-                ghost["pos"][1] = SUN_POS[1] + math.sin(orbit_angle) * orbit_radius
-                continue
-
-            ghost["pos"][0] += ghost["vel"][0]
-            ghost["pos"][1] += ghost["vel"][1]
-            ghost["trail"].append((ghost["pos"][0], ghost["pos"][1]))
-            if len(ghost["trail"]) > BLACK_HOLE_GHOST_TRAIL_LENGTH:
-                ghost["trail"].pop(0)
-
-            for target in huntable_planets[:]:
-                dx = ghost["pos"][0] - target["pos"][0]
-                dy = ghost["pos"][1] - target["pos"][1]
-                sum_r = BLACK_HOLE_GHOST_RADIUS + target["radius"]
-                if dx * dx + dy * dy < sum_r * sum_r:
-                    planet_debris_particles.extend(spawn_planet_debris(target, ghost["vel"]))
-                    for moon_data in get_moon_positions(target):
-                        planet_debris_particles.extend(spawn_moon_debris(moon_data["pos"]))
-                    target["moon_slots"] = []
-                    sync_moon_count(target)
-                    target["active"] = False
-                    ghost_capture_sound.play()
-                    huntable_planets.remove(target)
-                    break
-
-    # Update phase: move, bounce, sun collision
-    for body in bodies:
-        if not body["active"]:
-            continue
-
-        if body.get("black_hole_pull", False):
-            dx_to_sun = SUN_POS[0] - body["pos"][0]
-            dy_to_sun = SUN_POS[1] - body["pos"][1]
+            for _ in range(dt):
+                if self.rng.random() < spawn_chance:
+                    spawn_flare(self.rng, self.flares)
+
+    def update_planet_ai(self, dt=1):
+        """Planet face state + threat-response AI."""
+        bodies = self.bodies
+        level = self.level
+        planet_mask = bodies.planet_mask()
+        bodies.moon_angle[planet_mask] = (bodies.moon_angle[planet_mask] + bodies.moon_speed[planet_mask] * dt) % (2 * math.pi)
+        update_moon_directions(bodies, planet_mask)
+        active_planets = np.nonzero(planet_mask)[0]
+        away, has_prey = scan_planet_threats(bodies, active_planets, self.flares, level)
+        threatened = ~np.isnan(away[:, 0])
+        moods = np.where(threatened, WORRIED_MOOD_ID, np.where(has_prey, HAPPY_MOOD_ID, DEFAULT_MOOD_ID))
+        bodies.mood[active_planets] = moods
+
+        # Threatened planets other than Earth may try to flee.
+        escape_chance = min(
+            ESCAPE_CHANCE_MAX,
+            ESCAPE_CHANCE_BASE + (level - 1) * ESCAPE_CHANCE_PER_LEVEL,
+        )
+        escape_accel = min(
+            ESCAPE_ACCEL_MAX,
+            ESCAPE_ACCEL_BASE + (level - 1) * ESCAPE_ACCEL_PER_LEVEL,
+        ) * dt
+        if dt > 1:
+            # The chance that any of the step's ticks would have fled.
+            escape_chance = 1 - (1 - escape_chance) ** dt
+        fleeing = threatened & (bodies.kind[active_planets] != EARTH_KIND)
+        for slot in np.nonzero(fleeing)[0].tolist():
+            if self.rng.random() < escape_chance:
+                index = active_planets[slot]
+                vx = bodies.vx[index] + away[slot, 0] * escape_accel
+                vy = bodies.vy[index] + away[slot, 1] * escape_accel
+                speed = math.hypot(vx, vy)
+                if speed > PLANET_MAX_SPEED:
+                    vx = (vx / speed) * PLANET_MAX_SPEED
+                    vy = (vy / speed) * PLANET_MAX_SPEED
+                bodies.vx[index] = vx
+                bodies.vy[index] = vy
+
+    def update_ghosts(self, dt=1):
+        """Move the black hole ghosts and let them hunt planets.
+
+        Ghosts act in row order: each one steers at its nearest planet,
+        moves, and may capture a planet, which later ghosts then no longer
+        see. All ghosts are moved in one batch up to the first capture, and
+        the batch restarts after it, so only captures cost an extra pass.
+        """
+        ghosts = self.black_hole_ghosts
+        targets = TargetIndex(self.bodies, np.nonzero(self.bodies.planet_mask() & ~self.bodies.pulled)[0])
+        ghosts.phase[:] = (ghosts.phase + 0.08 * dt) % (2 * math.pi)
+        start = 0
+        while start < len(ghosts):
+            if not len(targets):
+                self.orbit_ghosts(slice(start, len(ghosts)), dt)
+                return
+            batch = slice(start, len(ghosts))
+            _, dx, dy = targets.nearest(ghosts.x[batch], ghosts.y[batch])
+            dist = np.hypot(dx, dy)
+            steer = dist > 0
+            safe_dist = np.where(steer, dist, 1.0)
+            phase = ghosts.phase[batch]
+            vx = np.where(steer, dx / safe_dist * ghosts.speed[batch] + np.cos(phase) * 0.65, ghosts.vx[batch])
+            vy = np.where(steer, dy / safe_dist * ghosts.speed[batch] + np.sin(phase * 1.3) * 0.65, ghosts.vy[batch])
+            x = ghosts.x[batch] + vx * dt
+            y = ghosts.y[batch] + vy * dt
+
+            caught = targets.first_contact(x, y, BLACK_HOLE_GHOST_RADIUS, vx * dt, vy * dt)
+            hunters = np.nonzero(caught >= 0)[0]
+            moved = int(hunters[0]) + 1 if hunters.size else len(x)
+            rows = slice(start, start + moved)
+            ghosts.vx[rows] = vx[:moved]
+            ghosts.vy[rows] = vy[:moved]
+            ghosts.x[rows] = x[:moved]
+            ghosts.y[rows] = y[:moved]
+            ghosts.push_trail(rows)
+            if hunters.size:
+                slot = int(caught[moved - 1])
+                self.shatter_planet(int(targets.rows[slot]), (vx[moved - 1], vy[moved - 1]))
+                self.sound_events.append("ghost_capture")
+                targets.remove(slot)
+            start += moved
+
+    def orbit_ghosts(self, rows, dt=1):
+        """Circle idle ghosts around the black hole."""
+        ghosts = self.black_hole_ghosts
+        off_x = ghosts.x[rows] - SUN_POS[0]
+        off_y = ghosts.y[rows] - SUN_POS[1]
+        orbit_angle = np.arctan2(off_y, off_x) + 0.04 * dt
+        orbit_radius = np.maximum(self.sun_radius + 110, np.hypot(off_x, off_y))
+        ghosts.x[rows] = SUN_POS[0] + np.cos(orbit_angle) * orbit_radius
+        ghosts.y[rows] = SUN_POS[1] + np.sin(orbit_angle) * orbit_radius
+
+    def shatter_planet(self, index, incoming_velocity):
+        """Destroy a planet along with its moons, leaving debris."""
+        debris = self.planet_debris_particles
+        spawn_planet_debris(self.np_rng, debris, self.bodies, index, incoming_velocity)
+        for _, moon_x, moon_y in get_moon_positions(self.bodies, index):
+            spawn_moon_debris(self.np_rng, debris, (moon_x, moon_y))
+        self.bodies.moon_slots[index] = 0
+        self.bodies.active[index] = False
+
+    def update_pulled_bodies(self, dt=1):
+        """Drag planets caught by black flares into the black hole."""
+        bodies = self.bodies
+        for index in np.nonzero(bodies.active & bodies.pulled)[0].tolist():
+            dx_to_sun = SUN_POS[0] - bodies.x[index]
+            dy_to_sun = SUN_POS[1] - bodies.y[index]
             dist_to_sun = math.hypot(dx_to_sun, dy_to_sun)
+            contact = self.sun_radius + bodies.radius[index] + 8
 
-            if dist_to_sun <= SUN_RADIUS + body["radius"] + 8:
-                planet_debris_particles.extend(spawn_planet_debris(body, body["vel"]))
-                for moon_data in get_moon_positions(body):
-                    planet_debris_particles.extend(spawn_moon_debris(moon_data["pos"]))
-                body["moon_slots"] = []
-                sync_moon_count(body)
-                flare_planet_impact_sound.play()
-                body["active"] = False
+            if dist_to_sun <= contact:
+                self.shatter_planet(index, (bodies.vx[index], bodies.vy[index]))
+                self.sound_events.append("flare_planet_impact")
                 continue
 
             if dist_to_sun > 0:
-                pull_speed = min(
-                    BLACK_HOLE_PULL_SPEED_MAX,
-                    body.get("black_hole_pull_speed", BLACK_HOLE_PULL_SPEED_MIN) + BLACK_HOLE_PULL_ACCEL,
-                )
-                body["black_hole_pull_speed"] = pull_speed
-                body["vel"][0] = (dx_to_sun / dist_to_sun) * pull_speed
-                body["vel"][1] = (dy_to_sun / dist_to_sun) * pull_speed
-                body["pos"][0] += body["vel"][0]
-                body["pos"][1] += body["vel"][1]
-            continue
+                pull_speed = min(BLACK_HOLE_PULL_SPEED_MAX, bodies.pull_speed[index] + BLACK_HOLE_PULL_ACCEL * dt)
+                bodies.pull_speed[index] = pull_speed
+                bodies.vx[index] = (dx_to_sun / dist_to_sun) * pull_speed
+                bodies.vy[index] = (dy_to_sun / dist_to_sun) * pull_speed
+                if pull_speed * dt >= dist_to_sun - contact:
+                    # This pull reaches the hole: shatter at the point of contact.
+                    travel = (dist_to_sun - contact) / dist_to_sun
+                    bodies.x[index] += dx_to_sun * travel
+                    bodies.y[index] += dy_to_sun * travel
+                    self.shatter_planet(index, (bodies.vx[index], bodies.vy[index]))
+                    self.sound_events.append("flare_planet_impact")
+                    continue
+                bodies.x[index] += bodies.vx[index] * dt
+                bodies.y[index] += bodies.vy[index] * dt
+
+    def move_bodies(self, inputs, dt=1):
+        """Steer Earth, then move, bounce and sun-test every free body at once."""
+        bodies = self.bodies
+        moving = bodies.active & ~bodies.pulled
 
-        # Earth player controls (arrows or WASD)
-        if body["name"] == "Earth":
+        # Earth player controls
+        earth = moving & (bodies.kind == EARTH_KIND)
+        if earth.any():
             vx, vy = 0.0, 0.0
-            if keys[pygame.K_LEFT] or keys[pygame.K_a]:
+            if inputs & INPUT_LEFT:
                 vx -= 1.0
-            if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
+            if inputs & INPUT_RIGHT:
                 vx += 1.0
-            if keys[pygame.K_UP] or keys[pygame.K_w]:
+            if inputs & INPUT_UP:
                 vy -= 1.0
-            if keys[pygame.K_DOWN] or keys[pygame.K_s]:
+            if inputs & INPUT_DOWN:
                 vy += 1.0
 
             mag = math.sqrt(vx * vx + vy * vy)
             if mag > 0:
                 vx = (vx / mag) * EARTH_SPEED
                 vy = (vy / mag) * EARTH_SPEED
-            body["vel"][0] = vx
-            body["vel"][1] = vy
+            bodies.vx[earth] = vx
+            bodies.vy[earth] = vy
 
         # Update position
-        body["pos"][0] += body["vel"][0]
-        body["pos"][1] += body["vel"][1]
+        bodies.x[moving] += bodies.vx[moving] * dt
+        bodies.y[moving] += bodies.vy[moving] * dt
 
         # Bounce off edges with clamping
-        if body["pos"][0] - body["radius"] < 0:
-            body["pos"][0] = body["radius"]
-            body["vel"][0] *= -1
-        elif body["pos"][0] + body["radius"] > WIDTH:
-            body["pos"][0] = WIDTH - body["radius"]
-            body["vel"][0] *= -1
-
-        if body["pos"][1] - body["radius"] < 0:
-            body["pos"][1] = body["radius"]
-            body["vel"][1] *= -1
-        elif body["pos"][1] + body["radius"] > HEIGHT:
-            body["pos"][1] = HEIGHT - body["radius"]
-            body["vel"][1] *= -1
-
-        # Sun collision check (optimized)
-        dx = body["pos"][0] - SUN_POS[0]
-        dy = body["pos"][1] - SUN_POS[1]
+        radius = bodies.radius
+        for pos, vel, limit in ((bodies.x, bodies.vx, WIDTH), (bodies.y, bodies.vy, HEIGHT)):
+            low = moving & (pos - radius < 0)
+            high = moving & ~low & (pos + radius > limit)
+            pos[low] = radius[low]
+            pos[high] = limit - radius[high]
+            vel[low | high] *= -1
+
+        # Sun collision check, swept so long steps cannot cross the sun
+        sun_radius = self.sun_radius
+        dx = bodies.x - SUN_POS[0]
+        dy = bodies.y - SUN_POS[1]
         dist_sq = dx * dx + dy * dy
-        sum_r = SUN_RADIUS + body["radius"]
-        if dist_sq < sum_r * sum_r:
-            if body["name"] != "Asteroid":
-                dist = math.sqrt(max(dist_sq, 1e-6))
-                nx, ny = dx / dist, dy / dist
-                impact_pos = [SUN_POS[0] + nx * SUN_RADIUS, SUN_POS[1] + ny * SUN_RADIUS]
-                sun_impact_splashes.extend(spawn_sun_impact_splash(impact_pos, (nx, ny)))
-                sun_impact_explosion_sound.play()
-                sun_impact_boost_timer = SUN_IMPACT_BOOST_FRAMES
-            body["active"] = False
-
-    # Wormhole teleportation
-    for body in bodies:
-        if not body["active"]:
-            continue
-        cooldown = body.get("wh_cooldown", 0)
-        if cooldown > 0:
-            body["wh_cooldown"] = cooldown - 1
-            continue
-        for idx, wh in enumerate(wormholes):
-            dx = body["pos"][0] - wh["pos"][0]
-            dy = body["pos"][1] - wh["pos"][1]
-            if math.hypot(dx, dy) < WORMHOLE_RADIUS:
-                other = wormholes[1 - idx]
-                body["pos"][0] = float(other["pos"][0])
-                body["pos"][1] = float(other["pos"][1])
-                body["wh_cooldown"] = WORMHOLE_COOLDOWN_FRAMES
-                break
-
-    # Update flares
-    for flare in flares[:]:
-        flare["pos"][0] += flare["vel"][0]
-        flare["pos"][1] += flare["vel"][1]
-        flare["lifetime"] -= 1
-
-        # Remove flare if it goes off screen or expires
-        if (flare["pos"][0] < -FLARE_RADIUS or flare["pos"][0] > WIDTH + FLARE_RADIUS or
-            flare["pos"][1] < -FLARE_RADIUS or flare["pos"][1] > HEIGHT + FLARE_RADIUS or
-            flare["lifetime"] <= 0):
-            flares.remove(flare)
-
-    # Update sun impact splash particles
-    for particle in sun_impact_splashes[:]:
-        particle["pos"][0] += particle["vel"][0]
-        particle["pos"][1] += particle["vel"][1]
-        particle["vel"][0] *= particle.get("drag", 0.95)
-        particle["vel"][1] *= particle.get("drag", 0.95)
-        particle["lifetime"] -= 1
-
-        if particle["lifetime"] <= 0:
-            sun_impact_splashes.remove(particle)
-
-    # Update flare-created planet debris particles
-    for piece in planet_debris_particles[:]:
-        piece["pos"][0] += piece["vel"][0]
-        piece["pos"][1] += piece["vel"][1]
-        piece["vel"][0] *= piece["drag"]
-        piece["vel"][1] *= piece["drag"]
-        piece["lifetime"] -= 1
-
-        if piece["lifetime"] <= 0:
-            planet_debris_particles.remove(piece)
-
-    # Flare collisions with bodies
-    for flare in flares[:]:
-        for body in bodies[:]:
-            if not body["active"]:
-                continue
-            if body.get("black_hole_pull", False):
-                continue
-
-            flare_kind = flare.get("kind", "solar")
-
-            if flare_kind == "black":
-                if body["name"] == "Asteroid":
-                    continue
-
-                dx = flare["pos"][0] - body["pos"][0]
-                dy = flare["pos"][1] - body["pos"][1]
-                sum_r = flare["radius"] + body["radius"]
-                if dx * dx + dy * dy < sum_r * sum_r:
-                    body["black_hole_pull"] = True
-                    body["black_hole_pull_speed"] = BLACK_HOLE_PULL_SPEED_MIN
-                    if flare in flares:
-                        flares.remove(flare)
-                    break
-                continue
+        sum_r = sun_radius + radius
+        move_x, move_y = bodies.tick_displacement(INTERPOLATION_SNAP_DISTANCE * dt)
+        toi = sweep_contact(dx, dy, move_x, move_y, sum_r)
+        ended_inside = dist_sq < sum_r * sum_r
+        # A sun that grew over a body only takes it if it is still inside.
+        started_inside = (dx - move_x) ** 2 + (dy - move_y) ** 2 < sum_r * sum_r
+        sun_hits = moving & (ended_inside | (np.isfinite(toi) & ~started_inside))
+        # Bodies that crossed the sun during the step splash where they first touched it.
+        back = np.where(sun_hits & ~ended_inside, 1 - toi, 0.0)
+        dx = dx - move_x * back
+        dy = dy - move_y * back
+        dist_sq = dx * dx + dy * dy
+        for index in np.nonzero(sun_hits & (bodies.kind != ASTEROID_KIND))[0].tolist():
+            dist = math.sqrt(max(dist_sq[index], 1e-6))
+            nx, ny = dx[index] / dist, dy[index] / dist
+            impact_pos = [SUN_POS[0] + nx * sun_radius, SUN_POS[1] + ny * sun_radius]
+            spawn_sun_impact_splash(self.np_rng, self.sun_impact_splashes, impact_pos, (nx, ny))
+            self.sound_events.append("sun_impact_explosion")
+            self.sun_impact_boost_timer = SUN_IMPACT_BOOST_FRAMES
+        bodies.active[sun_hits] = False
+
+    def update_wormholes(self, dt=1):
+        """Teleport bodies through the portals and spin them."""
+        bodies = self.bodies
+        cooling = bodies.active & (bodies.wh_cooldown > 0)
+        bodies.wh_cooldown[cooling] = np.maximum(bodies.wh_cooldown[cooling] - dt, 0)
+        ready = bodies.active & ~cooling
+        entered = []
+        for wh in self.wormholes:
+            inside = ready & (np.hypot(bodies.x - wh["pos"][0], bodies.y - wh["pos"][1]) < WORMHOLE_RADIUS)
+            ready &= ~inside
+            entered.append(inside)
+        for idx, inside in enumerate(entered):
+            other = self.wormholes[1 - idx]
+            bodies.x[inside] = float(other["pos"][0])
+            bodies.y[inside] = float(other["pos"][1])
+            bodies.wh_cooldown[inside] = WORMHOLE_COOLDOWN_FRAMES
+
+        for wh in self.wormholes:
+            wh["angle"] = (wh["angle"] + WORMHOLE_SPIN_SPEED * dt) % (2 * math.pi)
+
+    def update_flares(self, dt=1):
+        flares = self.flares
+        flares.x += flares.vx * dt
+        flares.y += flares.vy * dt
+        flares.lifetime -= dt
+
+        # Retire flares that go off screen or expire (compacted after collisions)
+        flares.active &= ~(
+            (flares.x < -FLARE_RADIUS) | (flares.x > WIDTH + FLARE_RADIUS)
+            | (flares.y < -FLARE_RADIUS) | (flares.y > HEIGHT + FLARE_RADIUS)
+            | (flares.lifetime <= 0)
+        )
 
-            if body["name"] != "Asteroid" and body.get("moons", 0) > 0:
-                moon_positions = get_moon_positions(body)
-                moon_hit = None
-                for moon_data in moon_positions:
-                    moon_pos = moon_data["pos"]
-                    dx = flare["pos"][0] - moon_pos[0]
-                    dy = flare["pos"][1] - moon_pos[1]
-                    moon_sum_r = flare["radius"] + MOON_RADIUS
-                    if dx * dx + dy * dy < moon_sum_r * moon_sum_r:
-                        moon_hit = moon_data
-                        break
-
-                if moon_hit is not None:
-                    remove_moon_from_body(body, moon_hit["slot_id"])
-                    planet_debris_particles.extend(spawn_moon_debris(moon_hit["pos"]))
-                    flare_planet_impact_sound.play()
-                    if flare in flares:
-                        flares.remove(flare)
-                    break
-
-            dx = flare["pos"][0] - body["pos"][0]
-            dy = flare["pos"][1] - body["pos"][1]
-            dist_sq = dx * dx + dy * dy
-            sum_r = flare["radius"] + body["radius"]
-            if dist_sq < sum_r * sum_r:
-                if body["name"] != "Asteroid":
-                    if body.get("moons", 0) > 0:
-                        moon_positions = get_moon_positions(body)
-                        impact_moon = min(
-                            moon_positions,
-                            key=lambda moon_data: (flare["pos"][0] - moon_data["pos"][0]) ** 2 + (flare["pos"][1] - moon_data["pos"][1]) ** 2,
-                        )
-                        remove_moon_from_body(body, impact_moon["slot_id"])
-                        planet_debris_particles.extend(spawn_moon_debris(impact_moon["pos"]))
-                        flare_planet_impact_sound.play()
-                    else:
-                        planet_debris_particles.extend(spawn_planet_debris(body, flare["vel"]))
-                        flare_planet_impact_sound.play()
-                        body["active"] = False
-                else:
-                    flare_hit_sound.play()
-                    body["active"] = False
-                if flare in flares:
-                    flares.remove(flare)
-                break
-
-    # Planet/Asteroid collisions (only among active survivors)
-    active_bodies = [b for b in bodies if b["active"]]
-    for i in range(len(active_bodies)):
-        for j in range(i + 1, len(active_bodies)):
-            b1 = active_bodies[i]
-            b2 = active_bodies[j]
-            if check_collision(b1, b2):
-                if b1["radius"] > b2["radius"]:
-                    # b1 eats b2: increase b1's radius by b2's radius
-                    b1["radius"] += b2["radius"]
-                    if b1["name"] != "Asteroid":
-                        if b2["name"] == "Asteroid":
-                            handle_asteroid_eat(b1)
-                        else:
-                            add_moon_to_body(b1)
-                    b2["active"] = False
-                    swallow_sound.play()
-                elif b2["radius"] > b1["radius"]:
-                    # b2 eats b1: increase b2's radius by b1's radius
-                    b2["radius"] += b1["radius"]
-                    if b2["name"] != "Asteroid":
-                        if b1["name"] == "Asteroid":
-                            handle_asteroid_eat(b2)
-                        else:
-                            add_moon_to_body(b2)
-                    b1["active"] = False
-                    swallow_sound.play()
-                # Equal size: both survive
-
-    # Check win condition
-    active_bodies = [b for b in bodies if b["active"]]
-    earth_alive = any(b for b in active_bodies if b["name"] == "Earth")
-    planets_alive = [b for b in active_bodies if b["name"] != "Asteroid"]
-    
-    if earth_alive and len(planets_alive) == 1:
-        # Only Earth remains - Level passed!
-        level_passed = True
-    elif not earth_alive:
-        # Earth destroyed - Game Over
-        game_over = True
-
-    # Update wormhole animation
-    for wh in wormholes:
-        wh["angle"] = (wh["angle"] + 0.05) % (2 * math.pi)
-
-    # Draw wormholes (behind everything else)
-    for wh in wormholes:
-        draw_wormhole(screen, wh)
-
-    # Draw Sun with glow
-    sun_is_orange = sun_impact_boost_timer > 0
-    blue_giant_start = int(SUN_AGE_MAX_FRAMES * SUN_BLUE_GIANT_START_RATIO)
-    if black_hole_active:
-        sun_color = BLACK
-        sun_glow = SUN_BLACK_HOLE_GLOW_COLOR
-    elif sun_collapsed:
-        sun_color = SUN_WHITE_DWARF_COLOR
-        sun_glow = SUN_WHITE_DWARF_GLOW_COLOR
-    elif sun_age_frames >= blue_giant_start:
-        sun_color = SUN_BLUE_GIANT_COLOR
-        sun_glow = SUN_BLUE_GIANT_GLOW_COLOR
-    else:
-        sun_color = SUN_COLOR
-        sun_glow = GLOW_COLOR
-    if sun_is_orange and not sun_collapsed and not black_hole_active:
-        sun_color = SUN_IMPACT_COLOR
-        sun_glow = SUN_IMPACT_GLOW_COLOR
-    pygame.draw.circle(screen, sun_color, SUN_POS, SUN_RADIUS)
-    pygame.draw.circle(screen, sun_glow, SUN_POS, SUN_RADIUS + 15, 15)
-    flare_near_sun = any(
-        f.get("kind", "solar") != "black" and math.hypot(f["pos"][0] - SUN_POS[0], f["pos"][1] - SUN_POS[1]) < SUN_RADIUS
-        for f in flares
-    )
-    if not black_hole_active:
-        draw_sun_face(screen, is_angry=flare_near_sun)
-
-    # Draw black hole ghosts.
-    if black_hole_active:
-        ghost_overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        for ghost in black_hole_ghosts:
-            gx, gy = int(ghost["pos"][0]), int(ghost["pos"][1])
-            phase_ratio = (math.sin(ghost["phase"] * 1.7) + 1.0) / 2.0
+    def update_particles(self, dt=1):
+        # Drag compounds per tick, so particles are stepped tick by tick.
+        for _ in range(dt):
+            self.sun_impact_splashes.update()
+            self.planet_debris_particles.update()
+
+    def check_win(self):
+        bodies = self.bodies
+        earth_alive = bool((bodies.active & (bodies.kind == EARTH_KIND)).any())
+        planets_alive = int(bodies.planet_mask().sum())
+
+        if earth_alive and planets_alive == 1:
+            # Only Earth remains - Level passed!
+            self.level_passed = True
+        elif not earth_alive:
+            # Earth destroyed - Game Over
+            self.game_over = True
+
+
+class Renderer:
+    """Draws a Simulation's current state onto a surface.
+
+    Everything is drawn shifted by (offset_x, offset_y), which is how the
+    collapse camera shake moves the frame without copying it. Moving rows
+    are drawn ``alpha`` of the way from their previous tick's position to
+    the current one, so frames between simulation ticks still move smoothly.
+
+    With ``dirty_rects`` the rectangles touched by each draw call are kept,
+    so the next frame only clears those and ``present`` only pushes the old
+    and new rectangles to the display. Shake and shockwave frames, which
+    move or cover the whole screen, fall back to a full clear and flip.
+    """
+
+    def __init__(self, screen, dirty_rects=USE_DIRTY_RECTS):
+        self.screen = screen
+        self.offset_x = 0
+        self.offset_y = 0
+        self.alpha = 1.0
+        self.dirty_rects = dirty_rects
+        self.needs_clear = True
+        self.full_frame = True
+        self.drawn = []
+        self.previous = []
+        self.font = pygame.font.Font(None, 36)
+        self.large_font = pygame.font.Font(None, 72)
+        self.small_font = None
+        self.earth_sprites = SpriteCache(EARTH_SPRITE_CACHE_BYTES)
+        self.planet_sprites = SpriteAtlas()
+        self.wormhole_frames = {}
+        self.ghost_sprites = {}
+        self.disc_offsets = {}
+
+    def blit_centered(self, sprite, x, y):
+        half = sprite.get_width() // 2
+        self.drawn.append(self.screen.blit(sprite, (x + self.offset_x - half, y + self.offset_y - half)))
+
+    def to_screen(self, pos):
+        return (pos[0] + self.offset_x, pos[1] + self.offset_y)
+
+    def update_camera_shake(self, sim):
+        """Pick this frame's shake offset for the collapse event."""
+        self.offset_x = self.offset_y = 0
+        if sim.camera_shake_timer > 0:
+            fade = sim.camera_shake_timer / max(1, COLLAPSE_SHAKE_FRAMES)
+            amplitude = max(1, int(sim.camera_shake_intensity * fade))
+            self.offset_x = random.randint(-amplitude, amplitude)
+            self.offset_y = random.randint(-amplitude, amplitude)
+
+    def draw(self, sim, alpha=1.0):
+        screen = self.screen
+        self.alpha = alpha
+        self.previous, self.drawn = self.drawn, []
+        self.full_frame = (
+            not self.dirty_rects
+            or sim.camera_shake_timer > 0
+            or sim.collapse_shockwave is not None
+            or self.needs_clear
+        )
+        self.needs_clear = False
+        if self.full_frame:
+            screen.fill(BLACK)
+        else:
+            for rect in self.previous:
+                screen.fill(BLACK, rect)
+        self.update_camera_shake(sim)
+
+        self.draw_wormholes(sim)
+
+        self.draw_sun(sim)
+        if sim.black_hole_active:
+            self.draw_ghosts(sim)
+        self.draw_shockwave(sim)
+        self.draw_bodies(sim)
+        self.draw_flares(sim)
+        self.draw_particles(sim)
+        self.draw_hud(sim)
+        if sim.profiler.visible:
+            self.draw_profiler(sim.profiler)
+
+    def present(self):
+        """Show the frame just drawn."""
+        if self.full_frame or len(self.previous) + len(self.drawn) > DIRTY_RECT_LIMIT:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.previous + self.drawn)
+
+    def draw_wormholes(self, sim):
+        """Draw wormholes (behind everything else) from cached animation frames."""
+        for wh in sim.wormholes:
+            key = (tuple(wh["color"]), wormhole_frame_index(wh["angle"]))
+            frame = self.wormhole_frames.get(key)
+            if frame is None:
+                frame = self.wormhole_frames[key] = render_wormhole_frame(*key)
+            self.blit_centered(frame, int(wh["pos"][0]), int(wh["pos"][1]))
+
+    def draw_sun(self, sim):
+        """Draw Sun with glow"""
+        screen = self.screen
+        sun_is_orange = sim.sun_impact_boost_timer > 0
+        blue_giant_start = int(SUN_AGE_MAX_FRAMES * SUN_BLUE_GIANT_START_RATIO)
+        if sim.black_hole_active:
+            sun_color = BLACK
+            sun_glow = SUN_BLACK_HOLE_GLOW_COLOR
+        elif sim.sun_collapsed:
+            sun_color = SUN_WHITE_DWARF_COLOR
+            sun_glow = SUN_WHITE_DWARF_GLOW_COLOR
+        elif sim.sun_age_frames >= blue_giant_start:
+            sun_color = SUN_BLUE_GIANT_COLOR
+            sun_glow = SUN_BLUE_GIANT_GLOW_COLOR
+        else:
+            sun_color = SUN_COLOR
+            sun_glow = GLOW_COLOR
+        if sun_is_orange and not sim.sun_collapsed and not sim.black_hole_active:
+            sun_color = SUN_IMPACT_COLOR
+            sun_glow = SUN_IMPACT_GLOW_COLOR
+        center = self.to_screen(SUN_POS)
+        pygame.draw.circle(screen, sun_color, center, sim.sun_radius)
+        # The glow ring bounds the sun and its face.
+        self.drawn.append(pygame.draw.circle(screen, sun_glow, center, sim.sun_radius + 15, 15))
+        flares = sim.flares
+        flare_near_sun = bool((
+            (flares.kind != FLARE_KIND_BLACK)
+            & (np.hypot(flares.x - SUN_POS[0], flares.y - SUN_POS[1]) < sim.sun_radius)
+        ).any())
+        if not sim.black_hole_active:
+            draw_sun_face(screen, sim.sun_radius, is_angry=flare_near_sun, center=center)
+
+    def ghost_sprite(self, key, render):
+        sprite = self.ghost_sprites.get(key)
+        if sprite is None:
+            sprite = self.ghost_sprites[key] = render()
+        return sprite
+
+    def draw_ghosts(self, sim):
+        """Blit each ghost and its trail from sprites cached per alpha bucket."""
+        bucket = BLACK_HOLE_GHOST_ALPHA_BUCKET
+        ghosts = sim.black_hole_ghosts
+        ghost_x, ghost_y = ghosts.drawn_positions(self.alpha)
+        for gx, gy, phase, trail, trail_len in zip(
+            ghost_x.tolist(), ghost_y.tolist(), ghosts.phase.tolist(),
+            ghosts.trail.tolist(), ghosts.trail_len.tolist(),
+        ):
+            phase_ratio = (math.sin(phase * 1.7) + 1.0) / 2.0
             ghost_alpha = int(BLACK_HOLE_GHOST_ALPHA_MIN + (BLACK_HOLE_GHOST_ALPHA_MAX - BLACK_HOLE_GHOST_ALPHA_MIN) * phase_ratio)
+            ghost_alpha -= ghost_alpha % bucket
 
-            for index, trail_pos in enumerate(ghost["trail"]):
-                trail_ratio = (index + 1) / max(1, len(ghost["trail"]))
+            trail = trail[len(trail) - trail_len:]
+            for index, trail_pos in enumerate(trail):
+                trail_ratio = (index + 1) / max(1, len(trail))
                 trail_alpha = int(ghost_alpha * trail_ratio * 0.35)
+                trail_alpha -= trail_alpha % bucket
+                if not trail_alpha:
+                    continue
                 trail_radius = max(4, int(BLACK_HOLE_GHOST_RADIUS * (0.45 + 0.35 * trail_ratio)))
-                tx, ty = int(trail_pos[0]), int(trail_pos[1])
-                pygame.draw.circle(ghost_overlay, (*GHOST_COLOR, trail_alpha), (tx, ty), trail_radius)
-
-            body_rect = pygame.Rect(gx - BLACK_HOLE_GHOST_RADIUS, gy - BLACK_HOLE_GHOST_RADIUS, BLACK_HOLE_GHOST_RADIUS * 2, BLACK_HOLE_GHOST_RADIUS * 2)
-            pygame.draw.ellipse(ghost_overlay, (*GHOST_COLOR, ghost_alpha), body_rect)
-            skirt_y = gy + BLACK_HOLE_GHOST_RADIUS // 2
-            for offset in (-10, 0, 10):
-                pygame.draw.circle(ghost_overlay, (*GHOST_COLOR, ghost_alpha), (gx + offset, skirt_y), 6)
-            eye_alpha = min(255, ghost_alpha + 25)
-            pygame.draw.circle(ghost_overlay, (*GHOST_EYE_COLOR, eye_alpha), (gx - 5, gy - 2), 2)
-            pygame.draw.circle(ghost_overlay, (*GHOST_EYE_COLOR, eye_alpha), (gx + 5, gy - 2), 2)
-        screen.blit(ghost_overlay, (0, 0))
-
-    # Draw collapse shockwave ring.
-    if collapse_shockwave is not None:
-        life_ratio = collapse_shockwave["life"] / max(1, collapse_shockwave["max_life"])
-        if collapse_shockwave.get("dark"):
+                puff = self.ghost_sprite(
+                    ("trail", trail_radius, trail_alpha),
+                    lambda: render_ghost_trail_sprite(trail_radius, trail_alpha),
+                )
+                self.blit_centered(puff, int(trail_pos[0]), int(trail_pos[1]))
+
+            body = self.ghost_sprite(("ghost", ghost_alpha), lambda: render_ghost_sprite(ghost_alpha))
+            self.blit_centered(body, int(gx), int(gy))
+
+    def draw_shockwave(self, sim):
+        """Draw collapse shockwave ring."""
+        shockwave = sim.collapse_shockwave
+        if shockwave is None:
+            return
+        life_ratio = shockwave["life"] / max(1, shockwave["max_life"])
+        if shockwave.get("dark"):
             ring_color = (
                 min(255, max(0, int(80 * life_ratio + 10))),
                 min(255, max(0, int(110 * life_ratio + 20))),
@@ -1385,125 +2642,530 @@ while running:
                 min(255, max(0, int(255 * life_ratio + 20))),
             )
         ring_thickness = max(2, int(12 * life_ratio))
-        pygame.draw.circle(screen, ring_color, SUN_POS, int(collapse_shockwave["radius"]), ring_thickness)
+        self.drawn.append(pygame.draw.circle(self.screen, ring_color, self.to_screen(SUN_POS), int(shockwave["radius"]), ring_thickness))
+
+    def draw_bodies(self, sim):
+        screen = self.screen
+        bodies = sim.bodies
+        body_x, body_y = bodies.drawn_positions(self.alpha)
+        # Small asteroids are splatted after the detailed bodies, which keeps
+        # them on top as when every body was drawn in row order.
+        splatted = bodies.active & (bodies.kind == ASTEROID_KIND) & (bodies.radius <= ASTEROID_SPLAT_MAX_RADIUS)
+        if screen.get_bytesize() != 4:
+            splatted[:] = False
+        drawn = np.nonzero(bodies.active & ~splatted)[0]
+        draw_x = body_x[drawn].astype(np.int64).tolist()
+        draw_y = body_y[drawn].astype(np.int64).tolist()
+        # Moons orbit the drawn position rather than the simulated one.
+        moon_dx, moon_dy = moon_offsets(bodies, drawn)
+        moon_x = (body_x[drawn][:, None] + moon_dx).astype(np.int64).tolist()
+        moon_y = (body_y[drawn][:, None] + moon_dy).astype(np.int64).tolist()
+        moon_slots = bodies.moon_slots[drawn].tolist()
+        draw_r = bodies.radius[drawn].tolist()
+        draw_kind = bodies.kind[drawn].tolist()
+        draw_color = bodies.color[drawn].tolist()
+        ox, oy = self.offset_x, self.offset_y
+        mark = self.drawn.append
+        for slot, index in enumerate(drawn.tolist()):
+            x, y, r, kind = draw_x[slot], draw_y[slot], draw_r[slot], draw_kind[slot]
+
+            # Draw Earth with realistic continents, or simple circle for other planets
+            sprited = 8 <= r <= SPRITE_MAX_RADIUS
+            if kind == EARTH_KIND and r <= SPRITE_MAX_RADIUS:
+                if sprited:
+                    self.blit_centered(self.earth_sprites.get(r, lambda: render_earth_sprite(r)), x, y)
+            else:
+                mark(pygame.draw.circle(screen, draw_color[slot], (x + ox, y + oy), r))
+
+            if (kind == SATURN_KIND or kind == URANUS_KIND) and r <= SPRITE_MAX_RADIUS:
+                rings = self.planet_sprites.get(kind, r, "rings", lambda: render_centered_sprite(
+                    r + 28, lambda surface, cx, cy: draw_planet_rings(surface, cx, cy, r, kind)))
+                self.blit_centered(rings, x, y)
+
+            # Mood face on planets (skip tiny asteroids)
+            if kind != ASTEROID_KIND:
+                for moon in range(MAX_MOONS):
+                    if not moon_slots[slot] & (1 << moon):
+                        continue
+                    mx, my = moon_x[slot][moon] + ox, moon_y[slot][moon] + oy
+                    pygame.draw.circle(screen, MOON_COLOR, (mx, my), MOON_RADIUS)
+                    mark(pygame.draw.circle(screen, MOON_GLOW_COLOR, (mx, my), MOON_RADIUS + 2, 1))
+                if sprited:
+                    mood = PLANET_MOODS[bodies.mood[index]]
+                    face = self.planet_sprites.get(kind, r, mood, lambda: render_centered_sprite(
+                        r + 4, lambda surface, cx, cy: draw_planet_face(surface, cx, cy, r, mood)))
+                    self.blit_centered(face, x, y)
+
+        self.draw_small_asteroids(
+            body_x[splatted].astype(np.int64) + ox, body_y[splatted].astype(np.int64) + oy,
+            bodies.radius[splatted], bodies.color[splatted],
+        )
 
-    # Draw active bodies
-    active_bodies = [b for b in bodies if b["active"]]  # Refresh after collisions
-    for body in active_bodies:
-        x, y = int(body["pos"][0]), int(body["pos"][1])
-        
-        # Draw Earth with realistic continents, or simple circle for other planets
-        if body["name"] == "Earth":
-            draw_earth_realistic(screen, body)
-        else:
-            pygame.draw.circle(screen, body["color"], (x, y), body["radius"])
-
-        # Saturn rings
-        if body["name"] == "Saturn":
-            for r in range(body["radius"] + 10, body["radius"] + 28, 5):
-                pygame.draw.circle(screen, RING_COLOR, (x, y), r, 3)
-
-        # Uranus rings (faint)
-        if body["name"] == "Uranus":
-            for r in range(body["radius"] + 6, body["radius"] + 18, 4):
-                pygame.draw.circle(screen, URANUS_RING_COLOR, (x, y), r, 1)
-
-        # Mood face on planets (skip tiny asteroids)
-        if body["name"] != "Asteroid":
-            for moon_data in get_moon_positions(body):
-                moon_pos = moon_data["pos"]
-                mx, my = int(moon_pos[0]), int(moon_pos[1])
-                pygame.draw.circle(screen, MOON_COLOR, (mx, my), MOON_RADIUS)
-                pygame.draw.circle(screen, MOON_GLOW_COLOR, (mx, my), MOON_RADIUS + 2, 1)
-            draw_planet_face(screen, body)
-
-    # Draw flares
-    for flare in flares:
-        if flare.get("kind", "solar") == "black":
-            continue
-        x, y = int(flare["pos"][0]), int(flare["pos"][1])
-        pygame.draw.circle(screen, flare["color"], (x, y), flare["radius"])
-        # Add glow effect to flares
-        pygame.draw.circle(screen, (255, 150, 50, 100), (x, y), flare["radius"] + 5, 2)
-
-    # Draw sun impact splash fragments
-    for particle in sun_impact_splashes:
-        life_ratio = particle["lifetime"] / max(1, particle["max_life"])
-        x, y = int(particle["pos"][0]), int(particle["pos"][1])
-        r = max(1, int(particle["radius"] * life_ratio + 1))
-        base_r, base_g, base_b = particle.get("base_color", (255, 160, 70))
-        brightness = 0.45 + 0.75 * life_ratio
-        color = (
-            min(255, int(base_r * brightness)),
-            min(255, int(base_g * brightness)),
-            min(255, int(base_b * brightness)),
+    def draw_small_asteroids(self, xs, ys, radii, colors):
+        """Splat each group of equal radius and colour with ``splat_discs``."""
+        if not xs.size:
+            return
+        keys = (radii << 24) | (colors[:, 0].astype(np.int64) << 16) | (colors[:, 1].astype(np.int64) << 8) | colors[:, 2]
+        groups, group_of = np.unique(keys, return_inverse=True)
+        for group, key in enumerate(groups.tolist()):
+            members = group_of == group
+            color = ((key >> 16) & 255, (key >> 8) & 255, key & 255)
+            self.splat_discs(xs[members], ys[members], key >> 24, color)
+
+    def splat_discs(self, xs, ys, radius, color):
+        """Write filled discs centred on integer screen positions into the pixels.
+
+        The disc shape is taken from ``pygame.draw.circle``, so the result
+        matches drawing each one separately.
+        """
+        screen = self.screen
+        offsets = self.disc_offsets.get(radius)
+        if offsets is None:
+            stamp = pygame.Surface((radius * 2 + 1, radius * 2 + 1))
+            pygame.draw.circle(stamp, (255, 255, 255), (radius, radius), radius)
+            dx, dy = np.nonzero(pygame.surfarray.array2d(stamp))
+            offsets = self.disc_offsets[radius] = (dx - radius, dy - radius)
+        dx, dy = offsets
+        width, height = screen.get_size()
+        stride = screen.get_pitch() // 4
+        mapped = screen.map_rgb(color)
+
+        pixels = np.frombuffer(screen.get_buffer(), dtype=np.uint32)
+        inside = (xs >= radius) & (xs < width - radius) & (ys >= radius) & (ys < height - radius)
+        # Sorted centres write memory nearly in order, which roughly halves the scatter.
+        starts = np.sort(ys[inside] * stride + xs[inside])
+        pixels[(starts[:, None] + (dy * stride + dx)[None, :]).ravel()] = mapped
+        # Discs cut by the screen edge keep only their visible pixels.
+        edge_x = (xs[~inside][:, None] + dx).ravel()
+        edge_y = (ys[~inside][:, None] + dy).ravel()
+        visible = (edge_x >= 0) & (edge_x < width) & (edge_y >= 0) & (edge_y < height)
+        pixels[edge_y[visible] * stride + edge_x[visible]] = mapped
+        del pixels
+
+        bounds = pygame.Rect(
+            int(xs.min()) - radius, int(ys.min()) - radius,
+            int(xs.max() - xs.min()) + radius * 2 + 1, int(ys.max() - ys.min()) + radius * 2 + 1,
         )
-        pygame.draw.circle(screen, color, (x, y), r)
-        if particle.get("kind") == "plasma" and life_ratio > 0.2:
-            pygame.draw.circle(screen, (255, min(255, color[1] + 35), min(255, color[2] + 20)), (x, y), r + 2, 1)
-
-    # Draw planet debris created by flare impacts
-    for piece in planet_debris_particles:
-        life_ratio = piece["lifetime"] / max(1, piece["max_life"])
-        x, y = int(piece["pos"][0]), int(piece["pos"][1])
-        r = max(1, int(piece["radius"] * (0.55 + life_ratio)))
-        c = piece["color"]
-        color = (
-            min(255, int(c[0] * (0.5 + life_ratio))),
-            min(255, int(c[1] * (0.5 + life_ratio))),
-            min(255, int(c[2] * (0.5 + life_ratio))),
+        self.drawn.append(bounds.clip(screen.get_rect()))
+
+    def draw_flares(self, sim):
+        flares = sim.flares
+        visible = flares.kind != FLARE_KIND_BLACK
+        flare_x, flare_y = flares.drawn_positions(self.alpha)
+        for x, y, radius, color in zip(
+            (flare_x[visible].astype(np.int64) + self.offset_x).tolist(),
+            (flare_y[visible].astype(np.int64) + self.offset_y).tolist(),
+            flares.radius[visible].tolist(),
+            flares.color[visible].tolist(),
+        ):
+            pygame.draw.circle(self.screen, color, (x, y), radius)
+            # Add glow effect to flares
+            self.drawn.append(pygame.draw.circle(self.screen, (255, 150, 50, 100), (x, y), radius + 5, 2))
+
+    def draw_particles(self, sim):
+        screen = self.screen
+        mark = self.drawn.append
+        # Draw sun impact splash fragments
+        splashes = sim.sun_impact_splashes
+        life_ratio = splashes.lifetime / np.maximum(1, splashes.max_life)
+        radii = np.maximum(1, (splashes.radius * life_ratio + 1).astype(np.int64))
+        brightness = (0.45 + 0.75 * life_ratio)[:, None]
+        colors = np.minimum(255, (splashes.color * brightness).astype(np.int64))
+        glowing = (splashes.kind == PARTICLE_KIND_PLASMA) & (life_ratio > 0.2)
+        splash_x, splash_y = splashes.drawn_positions(self.alpha)
+        for x, y, r, color, glow in zip(
+            (splash_x.astype(np.int64) + self.offset_x).tolist(),
+            (splash_y.astype(np.int64) + self.offset_y).tolist(),
+            radii.tolist(), colors.tolist(), glowing.tolist(),
+        ):
+            if glow:
+                pygame.draw.circle(screen, color, (x, y), r)
+                mark(pygame.draw.circle(screen, (255, min(255, color[1] + 35), min(255, color[2] + 20)), (x, y), r + 2, 1))
+            else:
+                mark(pygame.draw.circle(screen, color, (x, y), r))
+
+        # Draw planet debris created by flare impacts
+        debris = sim.planet_debris_particles
+        life_ratio = debris.lifetime / np.maximum(1, debris.max_life)
+        radii = np.maximum(1, (debris.radius * (0.55 + life_ratio)).astype(np.int64))
+        colors = np.minimum(255, (debris.color * (0.5 + life_ratio)[:, None]).astype(np.int64))
+        debris_x, debris_y = debris.drawn_positions(self.alpha)
+        for x, y, r, color in zip(
+            (debris_x.astype(np.int64) + self.offset_x).tolist(),
+            (debris_y.astype(np.int64) + self.offset_y).tolist(),
+            radii.tolist(), colors.tolist(),
+        ):
+            mark(pygame.draw.circle(screen, color, (x, y), r))
+
+    def draw_profiler(self, profiler):
+        """List each phase's rolling mean and p99 in the top-right corner."""
+        if self.small_font is None:
+            self.small_font = pygame.font.Font(None, 24)
+        lines = [("phase", "avg ms", "p99 ms", (200, 200, 200))]
+        for name, mean, p99 in profiler.summary():
+            over_budget = name == "total" and p99 > PROFILER_FRAME_BUDGET_MS
+            lines.append((name, f"{mean:.2f}", f"{p99:.2f}", (255, 90, 90) if over_budget else (255, 255, 255)))
+        for row, (name, mean, p99, color) in enumerate(lines):
+            y = 10 + row * 20
+            for column_x, text in ((WIDTH - 330, name), (WIDTH - 160, mean), (WIDTH - 80, p99)):
+                label = self.small_font.render(text, True, color)
+                self.drawn.append(self.screen.blit(label, (column_x, y)))
+
+    def draw_hud(self, sim):
+        screen = self.screen
+        font = self.font
+        large_font = self.large_font
+        mark = self.drawn.append
+
+        # Display level
+        level_text = font.render(f"Level: {sim.level}", True, (255, 255, 255))
+        mark(screen.blit(level_text, self.to_screen((10, 10))))
+
+        # Sun aging countdown and phase display
+        if sim.black_hole_active:
+            black_hole_text = font.render("Final stage: Black Hole", True, (130, 170, 255))
+            mark(screen.blit(black_hole_text, self.to_screen((10, 45))))
+        elif sim.sun_collapsed:
+            seconds_left = max(0, math.ceil((WHITE_DWARF_MAX_FRAMES - sim.white_dwarf_age_frames) / GAME_FPS))
+            countdown_text = font.render(f"Black Hole in: {seconds_left}s", True, (210, 235, 255))
+            mark(screen.blit(countdown_text, self.to_screen((10, 45))))
+        else:
+            seconds_left = max(0, math.ceil((SUN_AGE_MAX_FRAMES - sim.sun_age_frames) / GAME_FPS))
+            countdown_text = font.render(f"Sun Collapse in: {seconds_left}s", True, (180, 220, 255))
+            mark(screen.blit(countdown_text, self.to_screen((10, 45))))
+
+        # Draw level passed or game over message
+        if sim.level_passed:
+            success_text = large_font.render("SUCCESS!", True, (0, 255, 0))
+            passed_text = font.render("Level Passed!", True, (0, 255, 0))
+            space_text = font.render("Press SPACE to continue", True, (255, 255, 255))
+            mark(screen.blit(success_text, self.to_screen((WIDTH // 2 - 180, HEIGHT // 2 - 80))))
+            mark(screen.blit(passed_text, self.to_screen((WIDTH // 2 - 120, HEIGHT // 2))))
+            mark(screen.blit(space_text, self.to_screen((WIDTH // 2 - 140, HEIGHT // 2 + 60))))
+        elif sim.game_over:
+            gameover_text = large_font.render("GAME OVER", True, (255, 0, 0))
+            dead_text = font.render("Earth destroyed!", True, (255, 0, 0))
+            level_gameover_text = font.render(f"Level: {sim.level}", True, (255, 255, 100))
+            restart_text = font.render("Press SPACE to restart from Level 1", True, (255, 255, 255))
+            mark(screen.blit(gameover_text, self.to_screen((WIDTH // 2 - 200, HEIGHT // 2 - 80))))
+            mark(screen.blit(dead_text, self.to_screen((WIDTH // 2 - 130, HEIGHT // 2 - 10))))
+            mark(screen.blit(level_gameover_text, self.to_screen((WIDTH // 2 - 80, HEIGHT // 2 + 40))))
+            mark(screen.blit(restart_text, self.to_screen((WIDTH // 2 - 180, HEIGHT // 2 + 90))))
+
+
+def read_direction_keys(keys):
+    """Map arrow/WASD key state to INPUT_* direction bits."""
+    inputs = 0
+    if keys[pygame.K_LEFT] or keys[pygame.K_a]:
+        inputs |= INPUT_LEFT
+    if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
+        inputs |= INPUT_RIGHT
+    if keys[pygame.K_UP] or keys[pygame.K_w]:
+        inputs |= INPUT_UP
+    if keys[pygame.K_DOWN] or keys[pygame.K_s]:
+        inputs |= INPUT_DOWN
+    return inputs
+
+
+class Replay:
+    """A recorded session: its seed, start level, step size and every step's inputs.
+
+    Simulation steps depend on nothing else, so stepping a fresh
+    Simulation through ``inputs``, ``dt`` ticks at a time, reproduces the
+    session bit for bit. ``digest`` is the recorded session's final
+    ``state_digest``.
+    """
+
+    def __init__(self, seed, level=1, inputs=None, digest=bytes(20), dt=1):
+        self.seed = seed
+        self.level = level
+        self.inputs = bytearray() if inputs is None else inputs
+        self.digest = digest
+        self.dt = dt
+
+    def record(self, inputs):
+        self.inputs.append(inputs)
+
+    def save(self, path):
+        header = REPLAY_HEADER.pack(
+            REPLAY_MAGIC, REPLAY_VERSION, self.seed, self.level, self.dt, len(self.inputs), self.digest,
         )
-        pygame.draw.circle(screen, color, (x, y), r)
-
-    # Display level
-    level_text = font.render(f"Level: {LEVEL}", True, (255, 255, 255))
-    screen.blit(level_text, (10, 10))
-
-    # Sun aging countdown and phase display
-    if black_hole_active:
-        black_hole_text = font.render("Final stage: Black Hole", True, (130, 170, 255))
-        screen.blit(black_hole_text, (10, 45))
-    elif sun_collapsed:
-        seconds_left = max(0, math.ceil((WHITE_DWARF_MAX_FRAMES - white_dwarf_age_frames) / GAME_FPS))
-        countdown_text = font.render(f"Black Hole in: {seconds_left}s", True, (210, 235, 255))
-        screen.blit(countdown_text, (10, 45))
+        with open(path, "wb") as handle:
+            handle.write(header + zlib.compress(bytes(self.inputs), 9))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as handle:
+            data = handle.read()
+        magic, version, seed, level, dt, steps, digest = REPLAY_HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(f"{path} is not a version {REPLAY_VERSION} replay file")
+        inputs = bytearray(zlib.decompress(data[REPLAY_HEADER.size:]))
+        if len(inputs) != steps:
+            raise ValueError(f"{path} holds {len(inputs)} steps, expected {steps}")
+        return cls(seed, level, inputs, digest, dt)
+
+
+class FrameProfiler:
+    """Per-phase timings of each rendered frame, taken with perf_counter_ns.
+
+    ``lap(phase)`` charges the time since the previous ``mark`` or ``lap``
+    to ``phase``; a frame's ticks add up. ``end_frame`` files the frame into
+    a rolling window for ``summary`` and, with a CSV path, streams it out
+    together with the entity counts. ``visible`` is whether the overlay is
+    shown and ``enabled`` whether timings are collected: the overlay or a
+    CSV path turns collection on. Everything is a no-op while disabled.
+    """
+
+    def __init__(self, csv_path=None, window=PROFILER_WINDOW_FRAMES):
+        self.visible = False
+        self.enabled = csv_path is not None
+        self.history = np.zeros((window, len(PROFILER_PHASES)), dtype=np.int64)
+        self.frames = 0
+        self.current = dict.fromkeys(PROFILER_PHASES, 0)
+        self.last = 0
+        self.csv_file = None
+        self.csv_writer = None
+        if csv_path is not None:
+            self.csv_file = open(csv_path, "w", newline="")
+            self.csv_writer = csv.writer(self.csv_file)
+            self.csv_writer.writerow(
+                ["frame", "ticks"] + [f"{phase}_ms" for phase in PROFILER_PHASES]
+                + ["total_ms", "bodies", "asteroids", "flares", "ghosts", "particles"]
+            )
+
+    def toggle(self):
+        """Show or hide the overlay; CSV streaming carries on either way."""
+        self.visible = not self.visible
+        was_enabled = self.enabled
+        self.enabled = self.visible or self.csv_writer is not None
+        if self.enabled and not was_enabled:
+            self.frames = 0
+
+    def mark(self):
+        if self.enabled:
+            self.last = time.perf_counter_ns()
+
+    def lap(self, phase):
+        if self.enabled:
+            now = time.perf_counter_ns()
+            self.current[phase] += now - self.last
+            self.last = now
+
+    def end_frame(self, sim, ticks):
+        if not self.enabled:
+            return
+        row = [self.current[phase] for phase in PROFILER_PHASES]
+        self.history[self.frames % len(self.history)] = row
+        self.frames += 1
+        self.current = dict.fromkeys(PROFILER_PHASES, 0)
+        if self.csv_writer is not None:
+            bodies = sim.bodies
+            asteroids = int(np.count_nonzero(bodies.kind == ASTEROID_KIND))
+            self.csv_writer.writerow(
+                [sim.frame, ticks] + [f"{ns / 1e6:.4f}" for ns in row] + [f"{sum(row) / 1e6:.4f}"]
+                + [len(bodies), asteroids, len(sim.flares), len(sim.black_hole_ghosts),
+                   len(sim.sun_impact_splashes) + len(sim.planet_debris_particles)]
+            )
+
+    def summary(self):
+        """Return (name, mean ms, p99 ms) per phase and for the whole frame."""
+        filled = self.history[:min(self.frames, len(self.history))]
+        if not len(filled):
+            return []
+        per_phase = np.column_stack((filled, filled.sum(axis=1))) / 1e6
+        means = per_phase.mean(axis=0)
+        p99s = np.percentile(per_phase, 99, axis=0)
+        return list(zip(PROFILER_PHASES + ("total",), means.tolist(), p99s.tolist()))
+
+    def close(self):
+        if self.csv_file is not None:
+            self.csv_file.close()
+            self.csv_file = self.csv_writer = None
+
+
+class RewindBuffer:
+    """The most recent world snapshots, packed into one preallocated arena.
+
+    Snapshots are written back to back and the write position wraps to the
+    start when the next one would not fit, overwriting the oldest entries.
+    Memory stays at ``arena_bytes`` however long the game runs.
+    """
+
+    def __init__(self, seconds=REWIND_SECONDS, arena_bytes=REWIND_BUFFER_BYTES):
+        self.max_entries = seconds * GAME_FPS
+        # Uninitialised, so the OS maps pages in as snapshots first reach
+        # them instead of zeroing the whole arena before the first frame.
+        self.arena = np.empty(arena_bytes, dtype=np.uint8)
+        self.view = memoryview(self.arena)
+        self.entries = deque()  # (start, size), oldest first
+        self.head = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def push(self, snapshot):
+        size = len(snapshot)
+        if size > len(self.arena):
+            raise ValueError(f"snapshot of {size} bytes does not fit a {len(self.arena)} byte arena")
+        if self.head + size > len(self.arena):
+            # Entries past the head are left from the previous lap: the oldest.
+            while self.entries and self.entries[0][0] >= self.head:
+                self.entries.popleft()
+            self.head = 0
+        end = self.head + size
+        while self.entries and (
+            len(self.entries) >= self.max_entries or self.head <= self.entries[0][0] < end
+        ):
+            self.entries.popleft()
+        self.view[self.head:end] = snapshot
+        self.entries.append((self.head, size))
+        self.head = end
+
+    def pop(self):
+        """Drop the newest snapshot and return a view of it, or None if empty.
+
+        The view stays valid until the next ``push``.
+        """
+        if not self.entries:
+            return None
+        start, size = self.entries.pop()
+        self.head = start
+        return self.view[start:start + size]
+
+
+def run_replay(replay, render=False, dirty_rects=USE_DIRTY_RECTS):
+    """Step a recorded session as fast as possible, optionally drawing each step."""
+    sim = Simulation(seed=replay.seed, level=replay.level)
+    renderer = None
+    if render:
+        pygame.init()
+        screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        pygame.display.set_caption("Solar System Eating Game - Replay")
+        renderer = Renderer(screen, dirty_rects)
+
+    start = time.perf_counter()
+    for inputs in replay.inputs:
+        sim.step(inputs, replay.dt)
+        if renderer is not None:
+            pygame.event.pump()
+            renderer.draw(sim)
+            renderer.present()
+    elapsed = time.perf_counter() - start
+
+    ticks = len(replay.inputs) * replay.dt
+    print(f"Replayed {ticks} ticks ({ticks / GAME_FPS:.0f} s of play) in {elapsed:.2f} s, reached level {sim.level}")
+    if sim.state_digest() == replay.digest:
+        print("Final state matches the recording.")
     else:
-        seconds_left = max(0, math.ceil((SUN_AGE_MAX_FRAMES - sun_age_frames) / GAME_FPS))
-        countdown_text = font.render(f"Sun Collapse in: {seconds_left}s", True, (180, 220, 255))
-        screen.blit(countdown_text, (10, 45))
-
-    # Draw level passed or game over message
-    if level_passed:
-        success_text = large_font.render("SUCCESS!", True, (0, 255, 0))
-        passed_text = font.render("Level Passed!", True, (0, 255, 0))
-        space_text = font.render("Press SPACE to continue", True, (255, 255, 255))
-        screen.blit(success_text, (WIDTH // 2 - 180, HEIGHT // 2 - 80))
-        screen.blit(passed_text, (WIDTH // 2 - 120, HEIGHT // 2))
-        screen.blit(space_text, (WIDTH // 2 - 140, HEIGHT // 2 + 60))
-    elif game_over:
-        gameover_text = large_font.render("GAME OVER", True, (255, 0, 0))
-        dead_text = font.render("Earth destroyed!", True, (255, 0, 0))
-        level_gameover_text = font.render(f"Level: {LEVEL}", True, (255, 255, 100))
-        restart_text = font.render("Press SPACE to restart from Level 1", True, (255, 255, 255))
-        screen.blit(gameover_text, (WIDTH // 2 - 200, HEIGHT // 2 - 80))
-        screen.blit(dead_text, (WIDTH // 2 - 130, HEIGHT // 2 - 10))
-        screen.blit(level_gameover_text, (WIDTH // 2 - 80, HEIGHT // 2 + 40))
-        screen.blit(restart_text, (WIDTH // 2 - 180, HEIGHT // 2 + 90))
-
-    # Prune inactive bodies
-    bodies[:] = [b for b in bodies if b["active"]]
-
-    # Camera shake post-process for collapse event.
-    if camera_shake_timer > 0:
-        fade = camera_shake_timer / max(1, COLLAPSE_SHAKE_FRAMES)
-        amplitude = max(1, int(camera_shake_intensity * fade))
-        shake_x = random.randint(-amplitude, amplitude)
-        shake_y = random.randint(-amplitude, amplitude)
-        shaken_frame = screen.copy()
-        screen.fill(BLACK)
-        screen.blit(shaken_frame, (shake_x, shake_y))
-
-    pygame.display.flip()
-    clock.tick(GAME_FPS)
-
-pygame.quit()
\ No newline at end of file
+        print("Final state differs from the recording!")
+    if render:
+        pygame.quit()
+    return sim
+
+
+def parse_seed(text):
+    """Argparse type for --seed: replay headers store it as an unsigned 64-bit field."""
+    seed = int(text)
+    if not 0 <= seed < 2 ** 64:
+        raise argparse.ArgumentTypeError(f"seed must be in [0, 2**64), got {text}")
+    return seed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solar System Eating Game")
+    parser.add_argument("--seed", type=parse_seed, help="seed for the simulation (random by default)")
+    parser.add_argument("--record", metavar="PATH", help="save the seed and every tick's inputs to PATH on exit")
+    parser.add_argument("--replay", metavar="PATH", help="re-run a recorded session without a frame cap")
+    parser.add_argument("--render", action="store_true", help="draw every tick while replaying")
+    parser.add_argument("--profile-csv", metavar="PATH", help="profile every frame and write the timings to PATH")
+    parser.add_argument("--dirty-rects", action=argparse.BooleanOptionalAction, default=USE_DIRTY_RECTS,
+                        help="clear and present only the screen areas drawn each frame")
+    parser.add_argument("--fps-limit", type=int, default=RENDER_FPS_LIMIT, metavar="FPS",
+                        help=f"cap on rendered frames per second, 0 for uncapped (default {RENDER_FPS_LIMIT})")
+    args = parser.parse_args(argv)
+    if args.replay:
+        run_replay(Replay.load(args.replay), render=args.render, dirty_rects=args.dirty_rects)
+        return
+
+    seed = args.seed if args.seed is not None else random.getrandbits(63)
+    replay = Replay(seed) if args.record else None
+
+    pygame.init()
+    pygame.mixer.init()
+    pygame.mixer.set_num_channels(MIXER_CHANNELS)
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Solar System Eating Game - Player Controls Earth!")
+
+    sounds = SoundBank()
+    sounds.preload()
+    sound_queue = SoundQueue(sounds)
+    sim = Simulation(seed=seed)
+    sim.profiler = profiler = FrameProfiler(args.profile_csv)
+    renderer = Renderer(screen, args.dirty_rects)
+    rewind = RewindBuffer()
+    clock = pygame.time.Clock()
+
+    # Simulation ticks run at GAME_FPS in wall-clock time; every rendered
+    # frame runs however many ticks have come due and draws in between.
+    tick_seconds = 1.0 / GAME_FPS
+    accumulator = 0.0
+    last_time = time.perf_counter()
+    pending_inputs = 0
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+                pending_inputs |= INPUT_ADVANCE
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.toggle()
+        keys = pygame.key.get_pressed()
+        held_inputs = read_direction_keys(keys)
+        rewinding = keys[pygame.K_BACKSPACE]
+
+        now = time.perf_counter()
+        accumulator += now - last_time
+        last_time = now
+        ticks = 0
+        while accumulator >= tick_seconds and ticks < MAX_CATCH_UP_TICKS:
+            accumulator -= tick_seconds
+            ticks += 1
+            if rewinding:
+                # Holding BACKSPACE undoes one tick per tick, as far as the buffer reaches.
+                previous = rewind.pop()
+                if previous is not None:
+                    sim.restore(previous)
+                    if replay is not None:
+                        del replay.inputs[-1]
+                continue
+            # Key presses go to the first tick only; held keys steer every tick.
+            inputs = held_inputs | pending_inputs
+            profiler.mark()
+            rewind.push(sim.snapshot())
+            profiler.lap("snapshot")
+            sim.step(inputs)
+            if replay is not None:
+                replay.record(inputs)
+            pending_inputs = 0
+            sound_queue.extend(sim.sound_events)
+        accumulator = min(accumulator, tick_seconds)
+        sound_queue.flush()
+
+        profiler.mark()
+        renderer.draw(sim, accumulator / tick_seconds)
+        renderer.present()
+        profiler.lap("draw")
+        profiler.end_frame(sim, ticks)
+        clock.tick(args.fps_limit)
+
+    profiler.close()
+    if replay is not None:
+        replay.digest = sim.state_digest()
+        replay.save(args.record)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
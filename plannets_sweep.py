@@ -0,0 +1,271 @@
+"""Parameter sweeps over plannets_collision's tuning constants.
+
+Every parameter set plays the same seeded headless games, with Earth
+steered by a scripted or AI controller, spread over a multiprocessing
+pool. Results are aggregated per parameter set into a table of win rate,
+level reached and survival time.
+
+    python plannets_sweep.py --grid ESCAPE_CHANCE_BASE=0.2,0.3,0.4 --games 200
+    python plannets_sweep.py --sample FLARE_SPAWN_CHANCE=0.01:0.04 --samples 16 --output sweep.csv
+    python plannets_sweep.py --grid ESCAPE_CHANCE_BASE=0.2,0.4 --dt 4   # four ticks per step
+
+Only the constants in SWEEPABLE can be swept: the simulation reads them
+each time they are used, so setting them in a worker takes effect. Others
+are baked in at import time, into default arguments, column shapes or
+derived constants, and are rejected. The *_FRAMES constants derived from
+a *_SECONDS one are recomputed unless they are swept themselves.
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import csv
+import itertools
+import math
+import multiprocessing
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+import plannets_collision as game
+
+# Gameplay constants that the simulation only reads inside its functions.
+SWEEPABLE = frozenset({
+    "ASTEROIDS_PER_MOON", "MAX_ASTEROIDS", "NUM_ASTEROIDS",
+    "BLACK_FLARE_RADIUS", "BLACK_FLARE_SPAWN_CHANCE", "BLACK_FLARE_SPEED",
+    "BLACK_HOLE_GHOST_COUNT", "BLACK_HOLE_GHOST_RADIUS",
+    "BLACK_HOLE_GHOST_SPEED_MAX", "BLACK_HOLE_GHOST_SPEED_MIN",
+    "BLACK_HOLE_PULL_ACCEL", "BLACK_HOLE_PULL_SPEED_MAX", "BLACK_HOLE_PULL_SPEED_MIN",
+    "EARTH_SPEED", "PLANET_MAX_SPEED",
+    "ESCAPE_ACCEL_BASE", "ESCAPE_ACCEL_MAX", "ESCAPE_ACCEL_PER_LEVEL",
+    "ESCAPE_CHANCE_BASE", "ESCAPE_CHANCE_MAX", "ESCAPE_CHANCE_PER_LEVEL",
+    "FLARE_RADIUS", "FLARE_SPAWN_CHANCE", "FLARE_SPEED",
+    "GAME_FPS",
+    "MOON_ORBIT_GAP", "MOON_ORBIT_SPEED_MAX", "MOON_ORBIT_SPEED_MIN", "MOON_RADIUS",
+    "SUN_AGE_MAX_FRAMES", "SUN_LIFECYCLE_SECONDS",
+    "SUN_BLACK_HOLE_RADIUS_MULT", "SUN_BLUE_GIANT_RADIUS_MULT", "SUN_BLUE_GIANT_START_RATIO",
+    "SUN_COLLAPSE_FLARE_COUNT", "SUN_COLLAPSE_FLARE_SPEED_MAX", "SUN_COLLAPSE_FLARE_SPEED_MIN",
+    "SUN_IMPACT_BOOST_FRAMES", "SUN_IMPACT_BOOST_SECONDS", "SUN_IMPACT_FLARE_MULTIPLIER",
+    "SUN_WHITE_DWARF_RADIUS_MULT", "WHITE_DWARF_MAX_FRAMES", "WHITE_DWARF_SECONDS",
+    "THREAT_DETECTION_BASE", "THREAT_DETECTION_LEVEL_BONUS", "THREAT_DETECTION_PER_RADIUS",
+    "WORMHOLE_COOLDOWN_FRAMES", "WORMHOLE_RADIUS", "WORMHOLE_SPIN_SPEED",
+})
+
+DERIVED_FRAMES = {
+    "SUN_IMPACT_BOOST_FRAMES": "SUN_IMPACT_BOOST_SECONDS",
+    "SUN_AGE_MAX_FRAMES": "SUN_LIFECYCLE_SECONDS",
+    "WHITE_DWARF_MAX_FRAMES": "WHITE_DWARF_SECONDS",
+}
+# The evasive controller reacts to flares and bigger bodies this close to Earth.
+EVADE_RANGE = 220
+
+
+def scripted_controller(sim, earth):
+    """Sweep through every direction combination on a fixed schedule."""
+    return (sim.frame // 37) % 16
+
+
+def idle_controller(sim, earth):
+    return 0
+
+
+def evasive_controller(sim, earth):
+    """Flee nearby flares and bigger bodies, otherwise chase the nearest smaller one."""
+    bodies = sim.bodies
+    ex, ey, er = bodies.x[earth], bodies.y[earth], bodies.radius[earth]
+    push_x = push_y = 0.0
+
+    flares = sim.flares
+    dx = ex - flares.x
+    dy = ey - flares.y
+    dist = np.hypot(dx, dy)
+    near = (dist > 0) & (dist < EVADE_RANGE)
+    if near.any():
+        push_x += float((dx[near] / dist[near] ** 2).sum())
+        push_y += float((dy[near] / dist[near] ** 2).sum())
+
+    others = bodies.active.copy()
+    others[earth] = False
+    dx = bodies.x - ex
+    dy = bodies.y - ey
+    dist = np.hypot(dx, dy)
+    bigger = others & (bodies.radius >= er) & (dist > 0) & (dist < EVADE_RANGE + bodies.radius)
+    if bigger.any():
+        push_x -= float((dx[bigger] / dist[bigger] ** 2).sum())
+        push_y -= float((dy[bigger] / dist[bigger] ** 2).sum())
+
+    if not (push_x or push_y):
+        prey = np.nonzero(others & (bodies.radius < er))[0]
+        if not prey.size:
+            return 0
+        target = prey[np.argmin(dist[prey])]
+        push_x, push_y = float(dx[target]), float(dy[target])
+
+    inputs = 0
+    scale = max(abs(push_x), abs(push_y))
+    if push_x < -0.3 * scale:
+        inputs |= game.INPUT_LEFT
+    elif push_x > 0.3 * scale:
+        inputs |= game.INPUT_RIGHT
+    if push_y < -0.3 * scale:
+        inputs |= game.INPUT_UP
+    elif push_y > 0.3 * scale:
+        inputs |= game.INPUT_DOWN
+    return inputs
+
+
+CONTROLLERS = {
+    "evasive": evasive_controller,
+    "scripted": scripted_controller,
+    "idle": idle_controller,
+}
+
+
+def apply_parameters(params):
+    """Set swept constants on the game module, refreshing derived frame counts."""
+    for name, value in params.items():
+        setattr(game, name, value)
+    for frames_name, seconds_name in DERIVED_FRAMES.items():
+        if frames_name not in params and (seconds_name in params or "GAME_FPS" in params):
+            setattr(game, frames_name, getattr(game, seconds_name) * game.GAME_FPS)
+
+
+def play_game(task):
+    """Play one seeded game; return (param index, survived ticks, level, won)."""
+    param_index, params, seed, controller_name, levels, max_ticks, dt = task
+    apply_parameters(params)
+    controller = CONTROLLERS[controller_name]
+    sim = game.Simulation(seed=seed, level=1)
+    while sim.frame < max_ticks:
+        if sim.game_over:
+            break
+        if sim.level_passed:
+            if sim.level >= levels:
+                return param_index, sim.frame, sim.level, True
+            sim.step(game.INPUT_ADVANCE, dt)
+            continue
+        earth = np.nonzero(sim.bodies.active & (sim.bodies.kind == game.EARTH_KIND))[0]
+        sim.step(controller(sim, int(earth[0])) if earth.size else 0, dt)
+    return param_index, sim.frame, sim.level, False
+
+
+def parse_value(text, current):
+    return int(text) if isinstance(current, int) and text.lstrip("-").isdigit() else float(text)
+
+
+def tunable(name):
+    if name not in SWEEPABLE:
+        raise argparse.ArgumentTypeError(f"{name} is not a constant the simulation reads at run time (see SWEEPABLE)")
+    return getattr(game, name)
+
+
+def parse_grid(spec):
+    name, _, values = spec.partition("=")
+    current = tunable(name)
+    return name, [parse_value(text, current) for text in values.split(",")]
+
+
+def parse_sample(spec):
+    name, _, bounds = spec.partition("=")
+    current = tunable(name)
+    low, _, high = bounds.partition(":")
+    return name, parse_value(low, current), parse_value(high, current)
+
+
+def parameter_sets(grid, samples, sample_count, seed):
+    """Every grid combination, each paired with ``sample_count`` random draws."""
+    rng = random.Random(seed)
+    names = [name for name, _ in grid]
+    sets = []
+    for combination in itertools.product(*(values for _, values in grid)):
+        for _ in range(sample_count if samples else 1):
+            params = dict(zip(names, combination))
+            for name, low, high in samples:
+                if isinstance(low, int) and isinstance(high, int):
+                    params[name] = rng.randint(low, high)
+                else:
+                    params[name] = rng.uniform(low, high)
+            sets.append(params)
+    return sets
+
+
+def summarize(param_sets, outcomes):
+    """Aggregate per-game outcomes into one table row per parameter set."""
+    rows = []
+    for index, params in enumerate(param_sets):
+        games = outcomes[index]
+        survival = [ticks / game.GAME_FPS for ticks, _, _ in games]
+        rows.append(dict(params, **{
+            "games": len(games),
+            "win_rate": sum(won for _, _, won in games) / len(games),
+            "mean_level": statistics.fmean(level for _, level, _ in games),
+            "max_level": max(level for _, level, _ in games),
+            "mean_survival_s": statistics.fmean(survival),
+            "median_survival_s": statistics.median(survival),
+        }))
+    return rows
+
+
+def print_table(rows):
+    columns = list(rows[0])
+    cells = [[f"{row[column]:.4g}" if isinstance(row[column], float) else str(row[column])
+              for column in columns] for row in rows]
+    widths = [max(len(column), *(len(line[i]) for line in cells)) for i, column in enumerate(columns)]
+    print("  ".join(column.rjust(width) for column, width in zip(columns, widths)))
+    for line in cells:
+        print("  ".join(cell.rjust(width) for cell, width in zip(line, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--grid", action="append", default=[], type=parse_grid, metavar="NAME=V1,V2,...",
+                        help="sweep a constant over these values (repeatable; combined as a grid)")
+    parser.add_argument("--sample", action="append", default=[], type=parse_sample, metavar="NAME=LOW:HIGH",
+                        help="draw a constant uniformly from [LOW, HIGH] (repeatable)")
+    parser.add_argument("--samples", type=int, default=8, help="random draws per grid point with --sample")
+    parser.add_argument("--games", type=int, default=100, help="seeded games per parameter set")
+    parser.add_argument("--controller", choices=sorted(CONTROLLERS), default="evasive")
+    parser.add_argument("--levels", type=int, default=3, help="clearing this many levels counts as a win")
+    parser.add_argument("--max-seconds", type=float, default=180, help="game-time cap per game")
+    parser.add_argument("--dt", type=int, choices=(1, 2, 4, 8), default=1,
+                        help="simulation ticks per step; larger steps trade fidelity for speed")
+    parser.add_argument("--seed", type=int, default=0, help="first game seed; also seeds --sample draws")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--output", metavar="PATH", help="also write the table as CSV")
+    args = parser.parse_args(argv)
+
+    param_sets = parameter_sets(args.grid, args.sample, args.samples, args.seed)
+    max_ticks = int(args.max_seconds * game.GAME_FPS)
+    # The same seeds for every parameter set, so differences come from the parameters.
+    tasks = [
+        (index, params, args.seed + game_index, args.controller, args.levels, max_ticks, args.dt)
+        for index, params in enumerate(param_sets)
+        for game_index in range(args.games)
+    ]
+    outcomes = [[] for _ in param_sets]
+    start = time.perf_counter()
+    chunksize = max(1, math.ceil(len(tasks) / (args.jobs * 16)))
+    with multiprocessing.Pool(args.jobs) as pool:
+        for index, ticks, level, won in pool.imap_unordered(play_game, tasks, chunksize):
+            outcomes[index].append((ticks, level, won))
+    elapsed = time.perf_counter() - start
+
+    rows = summarize(param_sets, outcomes)
+    print_table(rows)
+    print(f"{len(tasks)} games on {args.jobs} processes in {elapsed:.1f} s ({len(tasks) / elapsed:.1f} games/s)")
+    if args.output:
+        with open(args.output, "w", newline="") as handle:
+            writer = csv.DictWriter(handle, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,7 @@
+import plannets_benchmark as bench
+
+
+def test_open_field_keeps_its_asteroids():
+    # Only the few that drift into the sun may go; nothing swallows the field.
+    stats = bench.run_scenario(bench.SCENARIOS["field_100000_asteroids"], frames=30)
+    assert stats["final_bodies"] >= 98_000
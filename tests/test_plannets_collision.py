@@ -0,0 +1,161 @@
+import argparse
+import random
+
+import numpy as np
+import pytest
+
+import plannets_collision as game
+
+
+def scripted_inputs(frame):
+    return (frame // 37) % 16
+
+
+def random_bodies(seed):
+    """A crowd of mostly equal asteroids among planets of assorted sizes."""
+    rng = random.Random(seed)
+    span = rng.choice([120, 200, 600])
+    bodies = game.BodyStore()
+    for _ in range(rng.randint(2, 300)):
+        radius = rng.choice([3, 3, 3, 3, 2, 4, 5, 10, 14, 20, 50])
+        kind = game.ASTEROID_KIND if radius <= 4 else rng.choice([game.EARTH_KIND, game.URANUS_KIND, game.SATURN_KIND])
+        row = bodies.add(kind, rng.uniform(0, span), rng.uniform(0, span), 0, 0, radius, (1, 1, 1))
+        if kind != game.ASTEROID_KIND:
+            bodies.moon_slots[row] = rng.randint(0, 7)
+        bodies.active[row] = rng.random() > 0.05
+    return bodies
+
+
+def ordered_scan(bodies, events):
+    """The reference: every pair of active bodies in index order, radii read as they grow."""
+    rows = np.nonzero(bodies.active)[0].tolist()
+    for n, i in enumerate(rows):
+        for j in rows[n + 1:]:
+            dist_sq = (bodies.x[i] - bodies.x[j]) ** 2 + (bodies.y[i] - bodies.y[j]) ** 2
+            if dist_sq < (bodies.radius[i] + bodies.radius[j]) ** 2:
+                if bodies.radius[i] > bodies.radius[j]:
+                    game.swallow(bodies, i, j, events)
+                elif bodies.radius[j] > bodies.radius[i]:
+                    game.swallow(bodies, j, i, events)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_resolve_swallows_matches_ordered_scan(seed):
+    expected, actual = random_bodies(seed), random_bodies(seed)
+    expected_events, actual_events = [], []
+    ordered_scan(expected, expected_events)
+    game.resolve_swallows(actual, actual_events)
+    for name, _, _ in game.BodyStore.FIELDS:
+        np.testing.assert_array_equal(getattr(actual, name), getattr(expected, name), err_msg=name)
+    assert actual_events == expected_events
+
+
+def test_snapshot_restore_reproduces_digest():
+    sim = game.Simulation(seed=5, level=3)
+    for frame in range(240):
+        sim.step(scripted_inputs(frame))
+    snapshot = sim.snapshot()
+    digest = sim.state_digest()
+    for frame in range(240, 360):
+        sim.step(scripted_inputs(frame))
+
+    restored = game.Simulation(seed=99, level=1)
+    restored.restore(memoryview(snapshot))
+    assert restored.state_digest() == digest
+    for frame in range(240, 360):
+        restored.step(scripted_inputs(frame))
+    assert restored.state_digest() == sim.state_digest()
+
+
+def test_replay_round_trip(tmp_path):
+    sim = game.Simulation(seed=11, level=2)
+    replay = game.Replay(seed=11, level=2)
+    for frame in range(600):
+        inputs = scripted_inputs(frame)
+        replay.record(inputs)
+        sim.step(inputs)
+    replay.digest = sim.state_digest()
+    path = tmp_path / "session.rep"
+    replay.save(path)
+
+    loaded = game.Replay.load(path)
+    assert (loaded.seed, loaded.level, loaded.inputs, loaded.digest) == (11, 2, replay.inputs, replay.digest)
+    assert game.run_replay(loaded).state_digest() == replay.digest
+
+
+@pytest.mark.parametrize("text", ["-1", str(2 ** 64), "seven"])
+def test_seed_must_fit_the_replay_header(text):
+    with pytest.raises((argparse.ArgumentTypeError, ValueError)):
+        game.parse_seed(text)
+    assert game.parse_seed(str(2 ** 64 - 1)) == 2 ** 64 - 1
+
+
+def empty_world():
+    sim = game.Simulation(seed=1, level=1)
+    sim.bodies.clear()
+    sim.flares.clear()
+    sim.bodies.add(game.EARTH_KIND, 100, game.HEIGHT - 100, 0, 0, 12, (0, 0, 255))
+    return sim
+
+
+@pytest.mark.parametrize("dt", [1, 2, 4, 8])
+def test_fast_flare_cannot_pass_a_thin_asteroid(dt):
+    sim = empty_world()
+    sim.bodies.add(game.ASTEROID_KIND, 1500, 300, 0, 0, 3, game.ASTEROID_COLOR)
+    # Starts 10 px short of contact; longer steps end far past the asteroid.
+    sim.flares.add(1500 - 10 - game.FLARE_RADIUS - 3, 300, game.SUN_COLLAPSE_FLARE_SPEED_MAX, 0,
+                   game.FLARE_RADIUS, game.FLARE_COLOR, 300)
+    sim.step(0, dt)
+    assert "flare_hit" in sim.sound_events
+    assert not (sim.bodies.kind == game.ASTEROID_KIND).any()
+
+
+@pytest.mark.parametrize("dt", [1, 2, 4, 8])
+def test_pulled_planet_cannot_pass_a_thin_asteroid(dt):
+    sim = empty_world()
+    sun_x, sun_y = game.SUN_POS
+    planet = sim.bodies.add(game.SATURN_KIND, sun_x + 500, sun_y, 0, 0, 10, (200, 200, 100)).start
+    sim.bodies.pulled[planet] = True
+    sim.bodies.pull_speed[planet] = game.BLACK_HOLE_PULL_SPEED_MAX
+    # 11 px short of contact, on the planet's way into the black hole.
+    sim.bodies.add(game.ASTEROID_KIND, sun_x + 500 - 11 - 13, sun_y, 0, 0, 3, game.ASTEROID_COLOR)
+    sim.step(0, dt)
+    assert "swallow" in sim.sound_events
+    assert not (sim.bodies.kind == game.ASTEROID_KIND).any()
+
+
+@pytest.mark.parametrize("dt", [2, 4, 8])
+def test_long_steps_keep_time_scales(dt):
+    sim = game.Simulation(seed=4, level=1)
+    for _ in range(120 // dt):
+        sim.step(0, dt)
+    assert sim.frame == 120
+    assert sim.sun_age_frames == 120
+
+
+def test_threat_scan_stays_on_the_grid(monkeypatch):
+    rng = np.random.default_rng(7)
+    count = 1000
+    radii = rng.choice([radius for _, radius, _ in game.PLANETS_DATA], count)
+    bodies = game.BodyStore()
+    bodies.add(game.URANUS_KIND, rng.uniform(0, game.WIDTH, count), rng.uniform(0, game.HEIGHT, count),
+               0, 0, radii, (1, 1, 1))
+    flagged = []
+    wide_queries = game.SpatialGrid.wide_queries
+
+    def recording(grid, qr):
+        flagged.append(wide_queries(grid, qr))
+        return flagged[-1]
+
+    monkeypatch.setattr(game.SpatialGrid, "wide_queries", recording)
+    game.scan_planet_threats(bodies, np.arange(count), game.FlareStore(), level=10)
+    assert flagged and not np.concatenate(flagged).any()
+
+
+def test_sprite_cache_is_bounded_by_bytes():
+    cache = game.SpriteCache(max_bytes=3 * 100 * 100 * 4)
+    for key, side in enumerate((100, 100, 100, 100, 300)):
+        cache.get(key, lambda: game.pygame.Surface((side, side), game.pygame.SRCALPHA))
+        assert cache.bytes <= cache.max_bytes or len(cache.entries) == 1
+    # The newest sprite stays even when it alone is over the limit.
+    assert list(cache.entries) == [4]